@@ -1,160 +1,268 @@
 import streamlit as st
+
+# Primeiro comando: a página começa a ser montada antes de as demais bibliotecas carregarem
+st.set_page_config(page_title="Painel Uber", layout="wide")
+
+import numpy as np
 import pandas as pd
 from datetime import timedelta
-import matplotlib.pyplot as plt
-import seaborn as sns
-import plotly.express as px
+from functools import wraps
 import plotly.graph_objects as go
+from painel.agregados import agregar_por_dia
+from painel.cache import CACHE, memorizar
+from painel.ajustes import ajustes_por_dia
+from painel.calendario import dia
+from painel.custos import lucro_diario, lucro_por_periodo
+from painel.formatacao import (
+    cores_variacoes, formatar_moeda, formatar_moedas, formatar_percentuais, formatar_variacoes, formatos_exibicao
+)
+from painel.dados import PASTA_BASE, carregar_bases, classificar_periodo, fatiar_periodo, posicoes_periodo
+from painel.motor import consultar_cubo, consultar_dias_semana, consultar_medianas, consultar_pareto
+from painel.simulacao import CAMINHOS_PADRAO, TURNOS, faturamento_dia_turno, simular_meta
+from painel.vigia import vigia_bases
+from painel.particoes import (
+    PASTA_FROTA, carregar_particoes, intervalo_datas, listar_motoristas, lucro_periodo, versao_motorista
+)
+from painel.quantis import (
+    ALFA, LIMITE_MEDIANAS_EXATAS, contagens_periodo, montar_esboco, quantil
+)
+from painel.perfil import (
+    TAMANHO_HISTORICO, Perfil, exportar_historico, resumo_historico, tabela_secoes
+)
+from painel.metricas import (
+    LIMITE_CORRIDAS_GRAFICOS, METRICAS_MOMWOW, METRICAS_PERCENTUAIS, amostrar_dispersao, calcular_rentabilidade, gerar_tabela_momwow,
+    histograma, matriz_calor, resumo_boxplot, visao_geral
+)
 
-st.set_page_config(page_title="Painel Uber", layout="wide")
+perfil = Perfil()
 
 # =========================
 # Helpers e Funções Utilitárias
 # =========================
 
-@st.cache_data
-def carregar_dados():
-    df_corridas = pd.read_excel('basedados/corridas_uber.xlsx', dtype={
-        'Tipo': 'string',
-        'KM': 'float64',
-        'Duracao': 'int64',
-        'Valor': 'float64',
-        'Link': 'string'
-    })
-    df_corridas['Data'] = pd.to_datetime(df_corridas['Data'], dayfirst=True)
-    df_corridas['Hora'] = pd.to_datetime(df_corridas['Hora'], format='%H:%M:%S', errors='coerce').dt.time
-
-    df_custos = pd.read_excel('basedados/gasolina.xlsx')
-    df_custos['Data'] = pd.to_datetime(df_custos['Data'], dayfirst=True)
-
-    return df_corridas, df_custos
-
-def classificar_periodo(hora):
-    if 5 <= hora < 12:
-        return 'Manhã'
-    elif 12 <= hora < 18:
-        return 'Tarde'
+@memorizar('carregar_dados')
+def carregar_dados(assinatura):
+    # A assinatura (caminho, mtime e tamanho das planilhas) faz parte da chave do cache:
+    # o Excel só é lido de novo quando algum arquivo muda, senão vem do Parquet em basedados/.cache.
+    # Corridas novas no fim da planilha são acrescentadas sem reprocessar o histórico.
+    # No modo frota a assinatura é ('frota', raiz, motorista, versão, início, fim) e só as
+    # partições desse motorista e período são lidas.
+    # Retorna (corridas, custos, ajustes e cancelamentos por dia).
+    if assinatura[0] == 'frota':
+        _, raiz, motorista, _, data_inicio, data_fim = assinatura
+        df_corridas, df_custos, df_ajustes = carregar_particoes(raiz, motorista, data_inicio, data_fim)
     else:
-        return 'Noite'
-
-def formatar_moeda(valor):
-    return f"R$ {valor:,.2f}".replace('.', 'X').replace(',', '.').replace('X', ',')
-
-def formatar_percentual(valor):
-    return f"{valor:.1f}%"
-
-def highlight_arrow(val):
-    if val == "-" or pd.isnull(val):
-        return ""
-    try:
-        val_float = float(val)
-        if val_float > 0:
-            return "color: #54DD5B;"
-        elif val_float < 0:
-            return "color: #EE595D;"
-        else:
-            return ""
-    except Exception:
-        return ""
-
-def format_arrow(val):
-    if val == "-" or pd.isnull(val):
-        return "-"
-    try:
-        val_float = float(val)
-        if val_float > 0:
-            return f"↑ {val_float:.1f}%"
-        elif val_float < 0:
-            return f"↓ {abs(val_float):.1f}%"
-        else:
-            return f"{val_float:.1f}%"
-    except Exception:
-        return "-"
-
-def gerar_tabela_momwow(df, periodo_col, col_metrica, nome_coluna, periodo_fmt, anterior_label):
-    df = df.assign(
-        Faturamento_por_Dia=df.groupby([periodo_col, 'Data'])['Valor'].transform('sum'),
-        Faturamento_por_Corrida=df.groupby([periodo_col, 'Data'])['Valor'].transform('sum') / df.groupby([periodo_col, 'Data'])['Valor'].transform('count')
-    )
-    agrupado = df.groupby(periodo_col).agg(
-        Valor=('Valor', 'sum'),
-        Faturamento_por_Dia=('Faturamento_por_Dia', 'mean'),
-        Faturamento_por_Corrida=('Faturamento_por_Corrida', 'mean')
-    ).reset_index()
-    agrupado[f'Valor {anterior_label} anterior'] = agrupado[col_metrica].shift(1)
-    agrupado['Diferença (%)'] = ((agrupado[col_metrica] - agrupado[f'Valor {anterior_label} anterior']) / agrupado[f'Valor {anterior_label} anterior']) * 100
-    agrupado['Período'] = agrupado[periodo_col].dt.strftime(periodo_fmt)
-    tabela = agrupado[['Período', col_metrica, f'Valor {anterior_label} anterior', 'Diferença (%)']].copy()
-    tabela.rename(columns={
-        col_metrica: nome_coluna,
-        f'Valor {anterior_label} anterior': f"{nome_coluna} {anterior_label} anterior",
-        'Diferença (%)': 'Variação'
-    }, inplace=True)
-    tabela[nome_coluna] = tabela[nome_coluna].apply(formatar_moeda)
-    tabela[f"{nome_coluna} {anterior_label} anterior"] = tabela[f"{nome_coluna} {anterior_label} anterior"].apply(
-        lambda x: formatar_moeda(x) if pd.notnull(x) else "-"
+        df_corridas, df_custos, df_ajustes = carregar_bases()
+    # O Link (um texto longo por corrida) só serve para ligar os ajustes às corridas: depois
+    # disso ele sai do DataFrame guardado no cache
+    ajustes_dia = ajustes_por_dia(df_corridas, df_ajustes)
+    return df_corridas.drop(columns='Link', errors='ignore'), df_custos, ajustes_dia
+
+@memorizar('intervalo_motorista')
+def intervalo_motorista(raiz, motorista, versao):
+    # Primeira e última data do motorista, sem carregar o histórico inteiro
+    return intervalo_datas(raiz, motorista)
+
+@memorizar('carregar_cubo')
+def carregar_cubo(assinatura):
+    # Cubo Data x Hora_int, agregado diário e ajustes por dia (ordenados por Data),
+    # montados uma vez por versão das planilhas
+    df_corridas, _, ajustes_dia = carregar_dados(assinatura)
+    cubo = consultar_cubo(df_corridas)
+    return cubo, agregar_por_dia(cubo), ajustes_dia
+
+@memorizar('carregar_esbocos', fixavel=False)
+def carregar_esbocos(assinatura):
+    # Esboços de quantis por dia (acumulados) para medianas aproximadas de qualquer período.
+    # São matrizes dias x baldes: só montadas quando um período passa de LIMITE_MEDIANAS_EXATAS corridas,
+    # e não ficam fixas com a versão no ar (seguem o PAINEL_CACHE_MB como os resultados por período)
+    df_corridas, _, _ = carregar_dados(assinatura)
+    _, diario, _ = carregar_cubo(assinatura)
+    return {
+        coluna: montar_esboco(df_corridas['Data'], df_corridas[coluna], diario['Data'])
+        for coluna in ('Valor', 'KM')
+    }
+
+@memorizar('carregar_lucro')
+def carregar_lucro(assinatura):
+    # Série diária de lucro líquido com os custos rateados pelos KM rodados, alinhada ao agregado diário
+    _, df_custos, _ = carregar_dados(assinatura)
+    if assinatura[0] == 'frota':
+        # Só o período foi carregado: os KM dos trechos de custo que passam das bordas são lidos à parte
+        _, raiz, motorista, _, data_inicio, data_fim = assinatura
+        return lucro_periodo(raiz, motorista, df_custos, data_inicio, data_fim)
+    _, diario, _ = carregar_cubo(assinatura)
+    return lucro_diario(diario, df_custos)
+
+@memorizar('calcular_tabela_momwow')
+def calcular_tabela_momwow(assinatura, data_inicio, data_fim, periodo, col_metrica, nome_coluna):
+    # Tabela MoM (periodo='Mes') ou WoW (periodo='Semana') de uma métrica, por versão da base e período do filtro
+    _, diario, ajustes_dia = carregar_cubo(assinatura)
+    inicio_dia, fim_dia = posicoes_periodo(diario, data_inicio, data_fim)
+    formato, rotulo = ('%b/%y', 'mês') if periodo == 'Mes' else ('%d/%m/%y', 'semana')
+    return gerar_tabela_momwow(
+        diario.iloc[inicio_dia:fim_dia], periodo, col_metrica, nome_coluna, formato, rotulo,
+        fatiar_periodo(ajustes_dia, data_inicio, data_fim)
     )
-    return tabela
 
+@memorizar('calcular_matriz_calor')
+def calcular_matriz_calor(assinatura, data_inicio, data_fim):
+    # Matriz 24 x 7 memorizada por versão da base e período do filtro
+    cubo, _, _ = carregar_cubo(assinatura)
+    return matriz_calor(fatiar_periodo(cubo, data_inicio, data_fim))
+
+@memorizar('calcular_curva_pareto')
+def calcular_curva_pareto(assinatura, data_inicio, data_fim):
+    # Curva de Pareto simplificada (poucas centenas de pontos) memorizada por período do filtro
+    df_corridas, _, _ = carregar_dados(assinatura)
+    return consultar_pareto(fatiar_periodo(df_corridas, data_inicio, data_fim))
+
+@memorizar('simular_meta_periodo')
+def simular_meta_periodo(assinatura, data_inicio, data_fim, meta_valor, dias_para_meta, caminhos):
+    # Monte Carlo memorizado por versão da base, período do filtro, meta, prazo e nº de caminhos
+    cubo, _, _ = carregar_cubo(assinatura)
+    historico = faturamento_dia_turno(fatiar_periodo(cubo, data_inicio, data_fim))
+    return simular_meta(historico, meta_valor, dias_para_meta, caminhos)
+
+def carregar_painel(assinatura):
+    # Modo frota: bases, cubo, agregado diário, ajustes por dia e série de lucro, com os caches anotados no perfil
+    df_corridas, df_custos, _ = perfil.cache('carregar_dados', carregar_dados, assinatura)
+    cubo, diario, ajustes_dia = perfil.cache('carregar_cubo', carregar_cubo, assinatura)
+    lucro_dia = perfil.cache('carregar_lucro', carregar_lucro, assinatura)
+    return df_corridas, df_custos, cubo, diario, ajustes_dia, lucro_dia
+
+def preparar_bases(assinatura):
+    # Executada pela vigia, fora das sessões, a cada nova versão das planilhas: bases e agregados,
+    # e os resultados da visão inicial (toda a base) já deixados no cache compartilhado
+    df_corridas, df_custos, _ = carregar_dados(assinatura)
+    cubo, diario, ajustes_dia = carregar_cubo(assinatura)
+    lucro_dia = carregar_lucro(assinatura)
+    if not df_corridas.empty:
+        data_min, data_max = df_corridas['Data'].iloc[0], df_corridas['Data'].iloc[-1]
+        col_metrica, nome_coluna = next(iter(METRICAS_MOMWOW.values()))
+        for periodo in ('Mes', 'Semana'):
+            calcular_tabela_momwow(assinatura, data_min, data_max, periodo, col_metrica, nome_coluna)
+        calcular_matriz_calor(assinatura, data_min, data_max)
+        calcular_curva_pareto(assinatura, data_min, data_max)
+    return df_corridas, df_custos, cubo, diario, ajustes_dia, lucro_dia
+
+def registrar_perfil(registro):
+    # Histórico da sessão (execuções completas e reexecuções de fragmentos), limitado às últimas
+    historico = st.session_state.setdefault('historico_perfil', [])
+    historico.append(registro)
+    del historico[:-TAMANHO_HISTORICO]
+    return historico
+
+def fragmento(nome):
+    # st.fragment medido no perfil: na execução completa o tempo entra na seção da página;
+    # quando só o fragmento roda de novo (um widget dele mudou), num perfil próprio
+    # que vai para o histórico da sessão. A função recebe o perfil como primeiro argumento.
+    def decorador(funcao):
+        @st.fragment
+        @wraps(funcao)
+        def executar(*args):
+            if not perfil.finalizado:
+                return funcao(perfil, *args)
+            perfil_fragmento = Perfil()
+            perfil_fragmento.secao(nome)
+            funcao(perfil_fragmento, *args)
+            registrar_perfil(perfil_fragmento.finalizar())
+        return executar
+    return decorador
+
+def estilizar_tabela_momwow(tabela, percentual=False):
+    # A tabela chega numérica; a formatação e as cores são feitas por coluna, só para exibir.
+    # Em métricas percentuais (taxa de cancelamento) a alta é ruim e fica vermelha
+    variacao = tabela['Variação'].to_numpy('float64')
+    formatar = formatar_percentuais if percentual else formatar_moedas
+    formatadores = {coluna: formatar for coluna in tabela.columns[1:3]}
+    formatadores['Variação'] = formatar_variacoes
+    return (
+        tabela.style
+            .format(formatos_exibicao(tabela, formatadores), na_rep="-")
+            .apply(lambda _: cores_variacoes(-variacao if percentual else variacao), subset=['Variação'])
+            .hide(axis="index")
+    )
 
-# Dicionário para garantir nomes dos dias em português
-dias_semana = {
-    'Monday': 'Segunda-feira',
-    'Tuesday': 'Terça-feira',
-    'Wednesday': 'Quarta-feira',
-    'Thursday': 'Quinta-feira',
-    'Friday': 'Sexta-feira',
-    'Saturday': 'Sábado',
-    'Sunday': 'Domingo'
-}
 
 # =========================
 # Carregamento e Preprocessamento
 # =========================
 
-df_corridas, df_custos = carregar_dados()
-
-# Preprocessamento
-df_corridas = df_corridas.assign(
-    Hora_decimal=lambda df: df['Hora'].apply(lambda t: t.hour + t.minute / 60),
-    Hora_int=lambda df: df['Hora'].apply(lambda t: t.hour),
-    DiaSemana=lambda df: df['Data'].dt.day_name().map(dias_semana),
-    Periodo=lambda df: df['Hora'].apply(lambda t: classificar_periodo(t.hour))
-)
+# O preprocessamento (Hora_seg, Hora_decimal, Hora_int, DiaSemana, Periodo) já vem feito de painel.dados.
+# Com uma base só, a sessão lê o último retrato pronto da vigia (painel.vigia), que remonta as
+# bases em segundo plano quando alguma planilha de basedados/ muda.
+# No modo frota (PAINEL_FROTA) o carregamento só acontece depois dos filtros: o motorista e o
+# período escolhidos decidem quais partições são lidas.
+if PASTA_FROTA is None:
+    perfil.secao("Carregamento")
+    assinatura, bases = perfil.cache('retrato_bases', vigia_bases(PASTA_BASE, preparar_bases).retrato)
+    df_corridas, df_custos, cubo, diario, ajustes_dia, lucro_dia = bases
+    data_min = df_corridas['Data'].iloc[0]
+    data_max = df_corridas['Data'].iloc[-1]
 
 # =========================
 # Filtros
 # =========================
 
+perfil.secao("Filtros", linhas=len(df_corridas) if PASTA_FROTA is None else None)
 st.sidebar.title("🎯 Filtros")
+if PASTA_FROTA is not None:
+    motoristas = listar_motoristas(PASTA_FROTA)
+    if not motoristas:
+        st.error(f"Nenhum motorista encontrado em `{PASTA_FROTA}`. Gere as partições com `python -m painel.particoes`.")
+        st.stop()
+    motorista = st.sidebar.selectbox("🚘 Motorista", motoristas, key="motorista")
+    versao = versao_motorista(PASTA_FROTA, motorista)
+    data_min, data_max = perfil.cache('intervalo_motorista', intervalo_motorista, PASTA_FROTA, motorista, versao)
 opcao_filtro = st.sidebar.selectbox("Selecione uma data", ["Toda a base", "Período específico", "Últimos X dias"])
 
 if opcao_filtro == "Toda a base":
-    data_inicio = df_corridas['Data'].min()
-    data_fim = df_corridas['Data'].max()
+    data_inicio = data_min
+    data_fim = data_max
 elif opcao_filtro == "Período específico":
-    data_min = df_corridas['Data'].min()
-    data_max = df_corridas['Data'].max()
     data_inicio = st.sidebar.date_input("Data Inicial", value=data_min, min_value=data_min, max_value=data_max)
     data_fim    = st.sidebar.date_input("Data Final", value=data_max, min_value=data_min, max_value=data_max)
 else:  # Últimos X dias
     dias = st.sidebar.slider("Quantidade de dias:", 1, 90, 30)
-    data_fim = df_corridas['Data'].max()
+    data_fim = data_max
     data_inicio = data_fim - timedelta(days=dias)
 
-filtro_corridas = df_corridas[(df_corridas['Data'] >= pd.to_datetime(data_inicio)) & (df_corridas['Data'] <= pd.to_datetime(data_fim))]
-filtro_custos   = df_custos[(df_custos['Data'] >= pd.to_datetime(data_inicio)) & (df_custos['Data'] <= pd.to_datetime(data_fim))]
-
-# Adicione as colunas 'Mes' e 'Semana' para análises MoM e WoW
-filtro_corridas = filtro_corridas.copy()
-filtro_corridas['Mes'] = filtro_corridas['Data'].dt.to_period('M').dt.to_timestamp()
-filtro_corridas['Semana'] = filtro_corridas['Data'].dt.to_period('W').apply(lambda r: r.start_time)
+if PASTA_FROTA is not None:
+    perfil.secao("Carregamento")
+    assinatura = (
+        'frota', PASTA_FROTA, motorista, versao,
+        pd.Timestamp(data_inicio).isoformat(), pd.Timestamp(data_fim).isoformat()
+    )
+    df_corridas, df_custos, cubo, diario, ajustes_dia, lucro_dia = carregar_painel(assinatura)
+    if df_corridas.empty:
+        st.warning("Nenhuma corrida deste motorista no período selecionado.")
+        st.stop()
+
+# As bases vêm ordenadas por Data e já com Mes/Semana: o filtro é só um recorte por busca binária
+filtro_corridas = fatiar_periodo(df_corridas, data_inicio, data_fim)
+filtro_custos   = fatiar_periodo(df_custos, data_inicio, data_fim)
+filtro_cubo     = fatiar_periodo(cubo, data_inicio, data_fim)
+filtro_ajustes  = fatiar_periodo(ajustes_dia, data_inicio, data_fim)
+inicio_dia, fim_dia = posicoes_periodo(diario, data_inicio, data_fim)
+filtro_dia      = diario.iloc[inicio_dia:fim_dia]
+filtro_lucro    = lucro_dia.iloc[inicio_dia:fim_dia]
+
+# Em períodos com muitas corridas as medianas saem dos esboços diários (erro relativo de até 1%)
+medianas_exatas = st.sidebar.checkbox(
+    "Sempre calcular medianas exatas",
+    value=False,
+    help=f"Acima de {LIMITE_MEDIANAS_EXATAS:,} corridas no período, as medianas são aproximadas "
+         f"a partir de esboços diários (erro de até {ALFA:.0%}). Marque para sempre usar as corridas.".replace(',', '.')
+)
+usar_esbocos = not medianas_exatas and len(filtro_corridas) > LIMITE_MEDIANAS_EXATAS
 
 
 # =========================
 # Visão Geral
 # =========================
 
+perfil.secao("Visão Geral", linhas=len(filtro_corridas))
 st.title("🚗 Painel de Desempenho: Uber")
 st.markdown(
     "Esse relatório se baseia apenas nas corridas **realizadas** e tem como objetivo "
@@ -164,91 +272,90 @@ st.markdown(f"##### Período analisado: `{data_inicio.strftime('%d/%m/%Y')}` a `
 st.markdown("---")
 st.subheader("💸 Visão Geral")
 
-receita_total = filtro_corridas['Valor'].sum()
-duracao = filtro_corridas['Duracao'].sum()
-duracao_hora = duracao // 60
-qtd_corridas = len(filtro_corridas)
-km_total = filtro_corridas['KM'].sum()
-valor_total_custos = filtro_custos['Valor'].sum()
-lucro_liquido = receita_total - valor_total_custos
-mediana_valor = filtro_corridas['Valor'].median()
-corridas_por_dia = filtro_corridas.groupby('Data').size()
-valor_por_dia = filtro_corridas.groupby('Data')['Valor'].sum()
-mediana_corridas_dia = corridas_por_dia.median()
-mediana_valor_dia = valor_por_dia.median()
-mediana_km_corrida = filtro_corridas['KM'].median() if not filtro_corridas.empty else 0
-dias_corridos = corridas_por_dia.size
+# As medianas por corrida saem das corridas ou, em períodos grandes, dos esboços diários
+if usar_esbocos:
+    esbocos = perfil.cache('carregar_esbocos', carregar_esbocos, assinatura)
+    medianas = (
+        quantil(contagens_periodo(esbocos['Valor'], inicio_dia, fim_dia), 0.5),
+        quantil(contagens_periodo(esbocos['KM'], inicio_dia, fim_dia), 0.5)
+    )
+else:
+    medianas = consultar_medianas(filtro_corridas)
+indicadores = visao_geral(filtro_dia, filtro_corridas, filtro_custos, filtro_ajustes, medianas)
+mediana_valor = indicadores['mediana_valor']
 
 col1, col2, col3, col4 = st.columns(4)
-col1.metric("Corridas", qtd_corridas)
-col2.metric("Corridas por Dia (Mediana)", f"{mediana_corridas_dia:.1f}")
-col3.metric("KM Rodados", f"{km_total:.2f} km")
-col4.metric("KM por Corrida (Mediana)", f"{mediana_km_corrida:.2f} km")
+col1.metric("Corridas", indicadores['corridas'])
+col2.metric("Corridas por Dia (Mediana)", f"{indicadores['mediana_corridas_dia']:.1f}")
+col3.metric("KM Rodados", f"{indicadores['km_total']:.2f} km")
+col4.metric("KM por Corrida (Mediana)", f"{indicadores['mediana_km_corrida']:.2f} km")
 
 col5, col6, col7, col8 = st.columns(4)
-col5.metric("Faturamento Bruto", formatar_moeda(receita_total))
-col6.metric("Faturamento por Dia (Mediana)", formatar_moeda(mediana_valor_dia))
+col5.metric("Faturamento Bruto", formatar_moeda(indicadores['faturamento_bruto']))
+col6.metric("Faturamento por Dia (Mediana)", formatar_moeda(indicadores['mediana_valor_dia']))
 col7.metric("Faturamento por Corrida (Mediana)", formatar_moeda(mediana_valor))
-col8.metric("Duração", f"{duracao:.0f} min /  {duracao_hora}h")
+col8.metric("Duração", f"{indicadores['duracao_min']:.0f} min /  {indicadores['duracao_min'] // 60:.0f}h")
 
 col9, col10, col11, col12 = st.columns(4)
-col9.metric("Custos Operacionais", formatar_moeda(valor_total_custos))
-col10.metric("Lucro Líquido", formatar_moeda(lucro_liquido))
-col11.metric("Dias Corridos", f"{dias_corridos}")
+col9.metric("Custos Operacionais", formatar_moeda(indicadores['custos']))
+col10.metric("Lucro Líquido", formatar_moeda(indicadores['lucro_liquido']))
+col11.metric("Dias Corridos", f"{indicadores['dias_corridos']}")
+col12.metric("Faturamento Ajustado", formatar_moeda(indicadores['faturamento_ajustado']))
+
+col13, col14, _, _ = st.columns(4)
+col13.metric("Cancelamentos", indicadores['cancelamentos'])
+col14.metric("Taxa de Cancelamento", formatar_percentuais([indicadores['taxa_cancelamento']])[0])
 
 # =========================
 # Gráficos Gerais
 # =========================
 
+perfil.secao("Gráficos Gerais", linhas=len(filtro_cubo))
 st.markdown("---")
 st.subheader("📈 Gráficos Gerais")
 
-opcoes_metricas = {
-    "Faturamento Bruto": ("Valor", "Faturamento"),
-    "Faturamento por Dia": ("Faturamento_por_Dia", "Faturamento por Dia"),
-    "Faturamento por Corrida": ("Faturamento_por_Corrida", "Faturamento por Corrida")
-}
-
-col_sel, _ = st.columns([0.25, 0.75])  # Ajuste o valor para o tamanho desejado
-with col_sel:
-    metrica_selecionada = st.selectbox(
-        "Métrica para análise comparativa:",
-        list(opcoes_metricas.keys()),
-        index=0,
-        key="metrica_momwow"
-    )
-st.markdown("")
-col_metrica, nome_coluna = opcoes_metricas[metrica_selecionada]
+# As seções com widgets próprios são fragmentos: trocar a métrica, a granularidade do lucro
+# ou a meta reexecuta só o fragmento, sem recalcular o restante do painel
+@fragmento("Comparativo MoM/WoW")
+def secao_momwow(perfil_secao, assinatura, data_inicio, data_fim):
+    col_sel, _ = st.columns([0.25, 0.75])  # Ajuste o valor para o tamanho desejado
+    with col_sel:
+        metrica_selecionada = st.selectbox(
+            "Métrica para análise comparativa:",
+            list(METRICAS_MOMWOW.keys()),
+            index=0,
+            key="metrica_momwow"
+        )
+    st.markdown("")
+    col_metrica, nome_coluna = METRICAS_MOMWOW[metrica_selecionada]
 
-col_tab_mom, col_tab_wow = st.columns(2)
+    col_tab_mom, col_tab_wow = st.columns(2)
 
-with col_tab_mom:
-    st.markdown(f"###### Comparativo por Mês (MoM) - {nome_coluna}")
-    tabela_mom = gerar_tabela_momwow(
-        filtro_corridas, 'Mes', col_metrica, nome_coluna, '%b/%y', 'mês'
-    )
-    st.dataframe(
-        tabela_mom.style
-            .map(highlight_arrow, subset=['Variação'])
-            .format({'Variação': format_arrow}, na_rep="-")
-            .hide(axis="index"),
-        use_container_width=True,
-        height=180
-    )
+    with col_tab_mom:
+        st.markdown(f"###### Comparativo por Mês (MoM) - {nome_coluna}")
+        tabela_mom = perfil_secao.cache(
+            'calcular_tabela_momwow', calcular_tabela_momwow,
+            assinatura, data_inicio, data_fim, 'Mes', col_metrica, nome_coluna
+        )
+        st.dataframe(
+            estilizar_tabela_momwow(tabela_mom, col_metrica in METRICAS_PERCENTUAIS),
+            use_container_width=True,
+            height=180
+        )
 
-with col_tab_wow:
-    st.markdown(f"###### Comparativo por Semana (WoW) - {nome_coluna}")
-    tabela_wow = gerar_tabela_momwow(
-        filtro_corridas, 'Semana', col_metrica, nome_coluna, '%d/%m/%y', 'semana'
-    )
-    st.dataframe(
-        tabela_wow.style
-            .map(highlight_arrow, subset=['Variação'])
-            .format({'Variação': format_arrow}, na_rep="-")
-            .hide(axis="index"),
-        use_container_width=True,
-        height=180
-    )
+    with col_tab_wow:
+        st.markdown(f"###### Comparativo por Semana (WoW) - {nome_coluna}")
+        tabela_wow = perfil_secao.cache(
+            'calcular_tabela_momwow', calcular_tabela_momwow,
+            assinatura, data_inicio, data_fim, 'Semana', col_metrica, nome_coluna
+        )
+        st.dataframe(
+            estilizar_tabela_momwow(tabela_wow, col_metrica in METRICAS_PERCENTUAIS),
+            use_container_width=True,
+            height=180
+        )
+
+secao_momwow(assinatura, data_inicio, data_fim)
 
 # =========================
 # Gráficos Visuais
@@ -259,65 +366,94 @@ col_graf1, col_graf2 = st.columns(2)
 with col_graf1:
     st.markdown("ㅤㅤ")
     st.markdown("###### Faturamento por Mês")
-    df_mes = filtro_corridas.copy()
-    df_mes['Periodo'] = df_mes['Data'].dt.to_period('D').dt.to_timestamp()
-    faturamento_mes = df_mes.groupby('Periodo')['Valor'].sum().reset_index()
+    faturamento_mes = pd.DataFrame({'Periodo': dia(filtro_dia['Data']), 'Valor': filtro_dia['Valor']})
     st.bar_chart(data=faturamento_mes, x='Periodo', y='Valor', use_container_width=True)
 
 with col_graf2:
     st.markdown("ㅤㅤ")
     st.markdown("###### Mapa de Calor - Faturamento por Hora x Dia")
-    df_heatmap = filtro_corridas.copy()
-    df_heatmap['Hora_int'] = df_heatmap['Hora'].apply(lambda x: x.hour if pd.notnull(x) else None)
-    dias_semana_abrev = {
-        'Monday': 'Seg', 'Tuesday': 'Ter', 'Wednesday': 'Qua', 'Thursday': 'Qui',
-        'Friday': 'Sex', 'Saturday': 'Sáb', 'Sunday': 'Dom'
-    }
-    df_heatmap['Dia_semana'] = df_heatmap['Data'].dt.day_name().map(dias_semana_abrev)
-    pivot_heatmap = df_heatmap.pivot_table(
-        index='Hora_int',
-        columns='Dia_semana',
-        values='Valor',
-        aggfunc='sum',
-        fill_value=0
+    pivot_heatmap = perfil.cache('calcular_matriz_calor', calcular_matriz_calor, assinatura, data_inicio, data_fim)
+    fig_calor = go.Figure(go.Heatmap(
+        z=pivot_heatmap.to_numpy(),
+        x=pivot_heatmap.columns,
+        y=pivot_heatmap.index,
+        colorscale="Blues",
+        xgap=1,
+        ygap=1,
+        colorbar=dict(title=dict(text="Faturamento (R$)", side="right")),
+        hovertemplate="%{x}, %{y}h: R$ %{z:.2f}<extra></extra>"
+    ))
+    fig_calor.update_layout(
+        height=420,
+        margin=dict(l=0, r=0, t=10, b=0),
+        yaxis=dict(autorange="reversed", dtick=2, title=""),
+        xaxis=dict(title="")
     )
-    dias_ordenados = ['Seg', 'Ter', 'Qua', 'Qui', 'Sex', 'Sáb', 'Dom']
-    pivot_heatmap = pivot_heatmap.reindex(columns=dias_ordenados)
-    sns.set_style("white")
-    fundo_cor = "#0E1117"
-    fig, ax = plt.subplots(figsize=(3, 2), facecolor=fundo_cor)
-    heatmap = sns.heatmap(
-        pivot_heatmap,
-        cmap="Blues",
-        linewidths=0.5,
-        annot=False,
-        fmt=".0f",
-        ax=ax,
-        cbar_kws={
-            'label': 'Faturamento (R$)',
-            'shrink': 1
-        }
+    st.plotly_chart(fig_calor, use_container_width=True)
+
+# =========================
+# Lucro Líquido e Custo por KM
+# =========================
+
+@fragmento("Lucro Líquido e Custo por KM")
+def secao_lucro(perfil_secao, filtro_lucro):
+    st.markdown("###### Lucro Líquido e Custo por KM")
+    st.markdown(
+        "Cada lançamento de custos é distribuído pelos KM rodados até o próximo lançamento do mesmo tipo "
+        "(ex.: um abastecimento vale até o abastecimento seguinte), então o lucro de cada período desconta "
+        "o custo do que foi efetivamente rodado nele."
     )
-    ax.set_facecolor(fundo_cor)
-    ax.set_xlabel('')
-    ax.set_ylabel('')
-    ax.tick_params(axis='both', labelsize=4, colors='white')
-    cbar = heatmap.collections[0].colorbar
-    cbar.ax.yaxis.label.set_size(5)
-    cbar.ax.yaxis.label.set_color('white')
-    cbar.ax.tick_params(colors='white', labelsize=5)
-    st.pyplot(fig)
+    granularidade = st.radio("Agrupar por:", ["Dia", "Semana", "Mês"], horizontal=True, key="granularidade_lucro")
+    if granularidade == "Dia":
+        serie_lucro = filtro_lucro.rename(columns={'Data': 'Periodo'})
+    else:
+        coluna_periodo = 'Semana' if granularidade == "Semana" else 'Mes'
+        serie_lucro = lucro_por_periodo(filtro_lucro, coluna_periodo).rename(columns={coluna_periodo: 'Periodo'})
+
+    col_lucro, col_custo_km = st.columns(2)
+
+    with col_lucro:
+        fig_lucro = go.Figure()
+        fig_lucro.add_trace(go.Bar(
+            x=serie_lucro['Periodo'], y=serie_lucro['Custos'], name="Custos rateados", marker_color="#EE595D"
+        ))
+        fig_lucro.add_trace(go.Scatter(
+            x=serie_lucro['Periodo'], y=serie_lucro['Lucro'], name="Lucro líquido",
+            mode="lines+markers", line=dict(color="#54DD5B")
+        ))
+        fig_lucro.update_layout(
+            title=f"Lucro Líquido por {granularidade}",
+            yaxis_title="R$",
+            hovermode="x unified",
+            legend=dict(orientation="h", y=-0.2)
+        )
+        st.plotly_chart(fig_lucro, use_container_width=True)
+
+    with col_custo_km:
+        fig_custo_km = go.Figure(go.Scatter(
+            x=serie_lucro['Periodo'], y=serie_lucro['Custo_por_KM'], mode="lines+markers",
+            line=dict(color="#ff7f0e"), hovertemplate="%{x}: R$ %{y:.2f}/km<extra></extra>"
+        ))
+        fig_custo_km.update_layout(title=f"Custo por KM por {granularidade}", yaxis_title="R$/KM")
+        st.plotly_chart(fig_custo_km, use_container_width=True)
+
+secao_lucro(filtro_lucro)
 
 # =========================
 # Análises Estatísticas
 # =========================
 
+perfil.secao("Análises Estatísticas", linhas=len(filtro_corridas))
 st.markdown("---")
 st.subheader("📊 Análises Estatísticas")
 
-df_rent = filtro_corridas[(filtro_corridas['KM'] > 0) & (filtro_corridas['Duracao'] > 0)].copy()
-df_rent['Rentabilidade_KM'] = df_rent['Valor'] / df_rent['KM']
-df_rent['Rentabilidade_Tempo'] = df_rent['Valor'] / df_rent['Duracao']
+# O plotly.express (~50 ms para importar num processo novo) só é carregado a partir desta
+# seção; o plotly.graph_objects já vem com o próprio Streamlit
+import plotly.express as px
+
+df_rent = calcular_rentabilidade(filtro_corridas)
+# Com muitas corridas, os gráficos são montados no servidor para não enviar cada corrida ao navegador
+modo_agregado = len(df_rent) > LIMITE_CORRIDAS_GRAFICOS
 
 col_rent1, col_rent2 = st.columns(2)
 
@@ -327,14 +463,25 @@ with col_rent1:
         "O histograma mostra a frequência de corridas em cada faixa de rentabilidade por quilômetro. "
         "Assim, é possível identificar se a maioria das corridas está concentrada em uma faixa específica ou se há muita variação."
     )
-    fig_hist = px.histogram(
-        df_rent,
-        x="Rentabilidade_KM",
-        nbins=30,
-        title="Distribuição da Rentabilidade por KM",
-        labels={"Rentabilidade_KM": "R$/KM"},
-        color_discrete_sequence=["#1f77b4"]
-    )
+    if modo_agregado:
+        contagens, bordas = histograma(df_rent['Rentabilidade_KM'], nbins=30)
+        fig_hist = go.Figure(go.Bar(
+            x=(bordas[:-1] + bordas[1:]) / 2,
+            y=contagens,
+            width=np.diff(bordas),
+            marker_color="#1f77b4",
+            hovertemplate="R$/KM %{x:.2f}: %{y} corridas<extra></extra>"
+        ))
+        fig_hist.update_layout(title="Distribuição da Rentabilidade por KM")
+    else:
+        fig_hist = px.histogram(
+            df_rent,
+            x="Rentabilidade_KM",
+            nbins=30,
+            title="Distribuição da Rentabilidade por KM",
+            labels={"Rentabilidade_KM": "R$/KM"},
+            color_discrete_sequence=["#1f77b4"]
+        )
     fig_hist.update_layout(bargap=0.1, xaxis_title="R$/KM", yaxis_title="Quantidade de Corridas")
     st.plotly_chart(fig_hist, use_container_width=True)
 
@@ -344,14 +491,36 @@ with col_rent2:
         "O boxplot destaca a mediana, os limites normais e os valores extremos (outliers) da rentabilidade por KM. "
         "Ele facilita a identificação de corridas fora do padrão, seja por promoções, tarifas dinâmicas ou situações atípicas."
     )
-    fig_box = px.box(
-        df_rent,
-        y="Rentabilidade_KM",
-        points="outliers",
-        title="Boxplot da Rentabilidade por KM",
-        labels={"Rentabilidade_KM": "R$/KM"},
-        color_discrete_sequence=["#ff7f0e"]
-    )
+    if modo_agregado:
+        resumo_box = resumo_boxplot(df_rent['Rentabilidade_KM'])
+        fig_box = go.Figure(go.Box(
+            x=["R$/KM"],
+            q1=[resumo_box['q1']],
+            median=[resumo_box['mediana']],
+            q3=[resumo_box['q3']],
+            lowerfence=[resumo_box['cerca_inferior']],
+            upperfence=[resumo_box['cerca_superior']],
+            marker_color="#ff7f0e",
+            boxpoints=False
+        ))
+        fig_box.add_trace(go.Scattergl(
+            x=["R$/KM"] * len(resumo_box['outliers']),
+            y=resumo_box['outliers'],
+            mode="markers",
+            marker=dict(color="#ff7f0e", size=4, opacity=0.6)
+        ))
+        fig_box.update_layout(title="Boxplot da Rentabilidade por KM", showlegend=False)
+        if resumo_box['total_outliers'] > len(resumo_box['outliers']):
+            st.caption(f"Exibindo {len(resumo_box['outliers'])} de {resumo_box['total_outliers']} outliers; quartis e limites calculados com todas as corridas.")
+    else:
+        fig_box = px.box(
+            df_rent,
+            y="Rentabilidade_KM",
+            points="outliers",
+            title="Boxplot da Rentabilidade por KM",
+            labels={"Rentabilidade_KM": "R$/KM"},
+            color_discrete_sequence=["#ff7f0e"]
+        )
     fig_box.update_layout(yaxis_title="R$/KM")
     st.plotly_chart(fig_box, use_container_width=True)
 
@@ -363,14 +532,18 @@ with col_disp:
         "Cada ponto representa uma corrida. O gráfico mostra se existe relação entre ganhar mais por quilômetro e por tempo. "
         "Corridas no canto superior direito são as mais rentáveis em ambos os aspectos."
     )
+    df_disp = amostrar_dispersao(df_rent, "Rentabilidade_KM", "Rentabilidade_Tempo") if modo_agregado else df_rent
+    if len(df_disp) < len(df_rent):
+        st.caption(f"Amostra estratificada de {len(df_disp)} de {len(df_rent)} corridas (regiões esparsas mantidas inteiras).")
     fig_scatter = px.scatter(
-        df_rent,
+        df_disp,
         x="Rentabilidade_KM",
         y="Rentabilidade_Tempo",
         hover_data=["Data", "Valor", "KM", "Duracao"],
         title="Rentabilidade por KM vs. Rentabilidade por Tempo",
         labels={"Rentabilidade_KM": "R$/KM", "Rentabilidade_Tempo": "R$/min"},
-        color_discrete_sequence=["#2ca02c"]
+        color_discrete_sequence=["#2ca02c"],
+        render_mode="webgl" if modo_agregado else "auto"
     )
     fig_scatter.update_traces(marker=dict(size=8, opacity=0.7))
     fig_scatter.update_layout(xaxis_title="Rentabilidade por KM (R$/KM)", yaxis_title="Rentabilidade por Tempo (R$/min)")
@@ -383,21 +556,18 @@ with col_pareto:
         "O objetivo é identificar se uma pequena parcela das corridas é responsável pela maior parte do faturamento. "
         "A linha vermelha indica o ponto onde 80% do faturamento é atingido."
     )
-    df_pareto = filtro_corridas.sort_values(by='Valor', ascending=False).copy()
-    df_pareto['cumulativo'] = df_pareto['Valor'].cumsum()
-    df_pareto['percentual'] = 100 * df_pareto['cumulativo'] / receita_total
-    df_pareto['corrida_num'] = range(1, len(df_pareto)+1)
-    pareto_cutoff = df_pareto[df_pareto['percentual'] <= 80]
-    percent_corridas = 100 * len(pareto_cutoff) / len(df_pareto)
+    df_pareto, percent_corridas = perfil.cache(
+        'calcular_curva_pareto', calcular_curva_pareto, assinatura, data_inicio, data_fim
+    )
     fig_pareto = go.Figure()
     fig_pareto.add_trace(go.Scatter(
         x=df_pareto['corrida_num'],
         y=df_pareto['percentual'],
-        mode='lines+markers',
+        mode='lines',
         name='Acumulado (%)'
     ))
     fig_pareto.add_shape(
-        type="line", x0=0, x1=len(df_pareto), y0=80, y1=80,
+        type="line", x0=0, x1=len(filtro_corridas), y0=80, y1=80,
         line=dict(color="red", width=1, dash="dash")
     )
     fig_pareto.update_layout(
@@ -412,41 +582,45 @@ with col_pareto:
 # Melhor e Pior Dia
 # =========================
 
-agrupado_dia = filtro_corridas.groupby('DiaSemana').agg(
-    median_valor=('Valor', 'median'),
-    mean_valor=('Valor', 'mean'),
-    std_valor=('Valor', 'std'),
-    count=('Valor', 'count')
-).reset_index()
-agrupado_dia = agrupado_dia[agrupado_dia['count'] >= 3]
-agrupado_dia['cv'] = (agrupado_dia['std_valor'] / agrupado_dia['mean_valor']) * 100
+perfil.secao("Melhor e Pior Dia", linhas=len(filtro_corridas))
+# Um único resumo por dia da semana alimenta esta seção e a Revisão Semanal. As medianas são
+# sempre exatas, mesmo em períodos grandes: as dos dias da semana costumam diferir menos que
+# a largura de um balde dos esboços, que empataria todos os dias
+resumo_semana = consultar_dias_semana(filtro_corridas)
+
+agrupado_dia = resumo_semana[resumo_semana['Corridas'] >= 3].copy()
+agrupado_dia['CV'] = (agrupado_dia['Desvio_Padrao'] / agrupado_dia['Média_por_Corrida']) * 100
 
 dias_ordenados = ['Segunda-feira', 'Terça-feira', 'Quarta-feira', 'Quinta-feira', 'Sexta-feira', 'Sábado', 'Domingo']
 agrupado_dia = agrupado_dia.set_index('DiaSemana').reindex(dias_ordenados).reset_index()
 fig_dias = px.bar(
     agrupado_dia,
     x='DiaSemana',
-    y='median_valor',
-    error_y='std_valor',
-    labels={'DiaSemana': 'Dia da Semana', 'median_valor': 'Mediana do Valor'},
+    y='Mediana_por_Corrida',
+    error_y='Desvio_Padrao',
+    labels={'DiaSemana': 'Dia da Semana', 'Mediana_por_Corrida': 'Mediana do Valor'},
     title='Mediana do Valor por Dia da Semana (com desvio padrão)'
 )
 st.plotly_chart(fig_dias, use_container_width=True)
-if not agrupado_dia.empty:
-    melhor_dia = agrupado_dia.loc[agrupado_dia['median_valor'].idxmax()]
-    pior_dia = agrupado_dia.loc[agrupado_dia['median_valor'].idxmin()]
+# Empates na mediana são desfeitos pela média por corrida
+ranking_dias = agrupado_dia.dropna(subset=['Mediana_por_Corrida']).sort_values(
+    ['Mediana_por_Corrida', 'Média_por_Corrida'], kind='stable'
+)
+if not ranking_dias.empty:
+    melhor_dia = ranking_dias.iloc[-1]
+    pior_dia = ranking_dias.iloc[0]
 
     col_melhor, col_pior = st.columns(2)
     with col_melhor:
         st.markdown(
-            f"👍 **Melhor dia**: {melhor_dia['DiaSemana']} com mediana de {formatar_moeda(melhor_dia['median_valor'])} "
-            f"em {int(melhor_dia['count'])} corridas (CV = {melhor_dia['cv']:.0f}%)",
+            f"👍 **Melhor dia**: {melhor_dia['DiaSemana']} com mediana de {formatar_moeda(melhor_dia['Mediana_por_Corrida'])} "
+            f"em {int(melhor_dia['Corridas'])} corridas (CV = {melhor_dia['CV']:.0f}%)",
             unsafe_allow_html=True
         )
     with col_pior:
         st.markdown(
-            f"👎 **Pior dia**: {pior_dia['DiaSemana']} com mediana de {formatar_moeda(pior_dia['median_valor'])} "
-            f"em {int(pior_dia['count'])} corridas (CV = {pior_dia['cv']:.0f}%)",
+            f"👎 **Pior dia**: {pior_dia['DiaSemana']} com mediana de {formatar_moeda(pior_dia['Mediana_por_Corrida'])} "
+            f"em {int(pior_dia['Corridas'])} corridas (CV = {pior_dia['CV']:.0f}%)",
             unsafe_allow_html=True
         )
 
@@ -454,87 +628,169 @@ if not agrupado_dia.empty:
 # Revisão Semanal
 # =========================
 
+perfil.secao("Revisão Semanal", linhas=len(filtro_corridas))
 st.markdown("---")
 st.subheader("📆 Revisão Semanal")
 
-agrupado_dia = filtro_corridas.groupby('DiaSemana').agg(
-    Faturamento=('Valor', 'sum'),
-    Média_por_Corrida=('Valor', 'mean'),
-    Mediana_por_Corrida=('Valor', 'median'),
-    Desvio_Padrao=('Valor', 'std'),
-    Corridas=('Valor', 'count')
-).reset_index()
-agrupado_dia = agrupado_dia[agrupado_dia['Corridas'] >= 3].copy()
+agrupado_dia = resumo_semana[resumo_semana['Corridas'] >= 3].copy()
 agrupado_dia['CV'] = (agrupado_dia['Desvio_Padrao'] / agrupado_dia['Média_por_Corrida']) * 100
 agrupado_dia.drop(columns=['Desvio_Padrao'], inplace=True)
 agrupado_dia['Dia'] = agrupado_dia['DiaSemana'].str[:3].str.capitalize()
 agrupado_dia.drop(columns=['DiaSemana'], inplace=True)
 agrupado_dia = agrupado_dia[['Dia', 'Faturamento', 'Corridas', 'Média_por_Corrida', 'Mediana_por_Corrida', 'CV']]
-agrupado_dia['Faturamento'] = agrupado_dia['Faturamento'].apply(formatar_moeda)
-agrupado_dia['Média_por_Corrida'] = agrupado_dia['Média_por_Corrida'].apply(formatar_moeda)
-agrupado_dia['Mediana_por_Corrida'] = agrupado_dia['Mediana_por_Corrida'].apply(formatar_moeda)
-agrupado_dia['CV'] = agrupado_dia['CV'].apply(formatar_percentual)
-st.dataframe(agrupado_dia.reset_index(drop=True), use_container_width=True)
+agrupado_dia = agrupado_dia.reset_index(drop=True)
+st.dataframe(
+    agrupado_dia.style.format(formatos_exibicao(agrupado_dia, {
+        'Faturamento': formatar_moedas,
+        'Média_por_Corrida': formatar_moedas,
+        'Mediana_por_Corrida': formatar_moedas,
+        'CV': formatar_percentuais
+    }), na_rep="-"),
+    use_container_width=True
+)
 
 # =========================
 # Calculadora de Metas
 # =========================
 
+perfil.secao("Calculadora de Metas", linhas=len(filtro_dia))
 st.markdown("---")
 st.subheader("🎯 Calculadora de Metas")
 st.markdown("Use esta calculadora para definir sua meta de faturamento bruto, visualizar a quantidade de corridas "
 "necessárias por dia e ajustar sua estratégia com base no seu desempenho atual.", unsafe_allow_html=True)
 
-col1, col2 = st.columns(2)
-with col1:
-    meta_valor = st.number_input("Qual sua meta de faturamento bruto (R$)?", min_value=0.0, step=100.0, value=0.0)
-with col2:
-    dias_para_meta = st.number_input("Em quantos dias deseja alcançar a meta?", min_value=1, step=1, value=30)
-
-# Só mostra os resultados se ambos os campos forem preenchidos (>0)
-if meta_valor > 0 and dias_para_meta > 0:
-    meta_dia = meta_valor / dias_para_meta
-    media_corrida = filtro_corridas['Valor'].mean() if not filtro_corridas.empty else 0
-    corridas_necessarias_dia = meta_dia / media_corrida if media_corrida > 0 else 0
-
-    # Valores reais do período filtrado
-    faturamento_por_dia = filtro_corridas.groupby('Data')['Valor'].sum()
-    faturamento_medio_atual = faturamento_por_dia.mean() if not faturamento_por_dia.empty else 0
-    corridas_por_dia_real = filtro_corridas.groupby('Data').size().mean() if not filtro_corridas.empty else 0
-    dias_atingir_meta = meta_valor / faturamento_medio_atual if faturamento_medio_atual > 0 else 0
-    mediana_valor_corrida_real = filtro_corridas['Valor'].median() if not filtro_corridas.empty else 0
-
-    col_sim, col_dist = st.columns(2)
-
-    with col_sim:
-        st.markdown("### 📌 Resultado da Simulação")
-        st.markdown(f"- **Meta diária sugerida:** R$ {meta_dia:.2f}  *<span style='color:gray'>(No momento você faz: RS {faturamento_medio_atual:.2f})*</span>", unsafe_allow_html=True)
-        st.markdown(f"- **Meta por Corrida sugerida:** R$ {media_corrida:.2f} *<span style='color:gray'>(No momento você faz: RS {mediana_valor_corrida_real:.1f})*</span>", unsafe_allow_html=True) 
-        st.markdown(f"- **Corridas necessárias:** {corridas_necessarias_dia:.1f} *<span style='color:gray'>(No momento você faz: {corridas_por_dia_real:.1f} corridas/dia)*</span>", unsafe_allow_html=True)
-        st.markdown(f"-  No ritmo atual, você atingiria a meta em aproximadamente: {dias_atingir_meta:.0f} dias", unsafe_allow_html=True)
-
-    with col_dist:
-        st.markdown("### ⏰ Sugestão por Turno")
-        distrib_turno = filtro_corridas['Periodo'].value_counts(normalize=True) * 100
-        corridas_turno_real = filtro_corridas.groupby('Periodo').size() / dias_para_meta if dias_para_meta > 0 else 0
-        faturamento_turno_real = filtro_corridas.groupby('Periodo')['Valor'].sum() / dias_para_meta if dias_para_meta > 0 else 0
-        for turno in ['Manhã', 'Tarde', 'Noite']:
-            perc = distrib_turno.get(turno, 0)
-            qtd_turno = (corridas_necessarias_dia * perc / 100)
-            real_corridas = corridas_turno_real.get(turno, 0)
-            real_fat = faturamento_turno_real.get(turno, 0)
+@fragmento("Calculadora de Metas")
+def secao_calculadora(perfil_secao, assinatura, filtro_corridas, filtro_dia, filtro_cubo, data_inicio, data_fim, mediana_valor):
+    col1, col2 = st.columns(2)
+    with col1:
+        meta_valor = st.number_input("Qual sua meta de faturamento bruto (R$)?", min_value=0.0, step=100.0, value=0.0)
+    with col2:
+        dias_para_meta = st.number_input("Em quantos dias deseja alcançar a meta?", min_value=1, step=1, value=30)
+
+    # Só mostra os resultados se ambos os campos forem preenchidos (>0)
+    if meta_valor > 0 and dias_para_meta > 0:
+        meta_dia = meta_valor / dias_para_meta
+        media_corrida = filtro_corridas['Valor'].mean() if not filtro_corridas.empty else 0
+        corridas_necessarias_dia = meta_dia / media_corrida if media_corrida > 0 else 0
+
+        # Valores reais do período filtrado
+        faturamento_por_dia = filtro_dia['Valor']
+        faturamento_medio_atual = faturamento_por_dia.mean() if not faturamento_por_dia.empty else 0
+        corridas_por_dia_real = filtro_dia['Corridas'].mean() if not filtro_dia.empty else 0
+        dias_atingir_meta = meta_valor / faturamento_medio_atual if faturamento_medio_atual > 0 else 0
+        mediana_valor_corrida_real = mediana_valor if not filtro_corridas.empty else 0
+
+        col_sim, col_dist = st.columns(2)
+
+        with col_sim:
+            st.markdown("### 📌 Resultado da Simulação")
+            st.markdown(f"- **Meta diária sugerida:** R$ {meta_dia:.2f}  *<span style='color:gray'>(No momento você faz: RS {faturamento_medio_atual:.2f})*</span>", unsafe_allow_html=True)
+            st.markdown(f"- **Meta por Corrida sugerida:** R$ {media_corrida:.2f} *<span style='color:gray'>(No momento você faz: RS {mediana_valor_corrida_real:.1f})*</span>", unsafe_allow_html=True) 
+            st.markdown(f"- **Corridas necessárias:** {corridas_necessarias_dia:.1f} *<span style='color:gray'>(No momento você faz: {corridas_por_dia_real:.1f} corridas/dia)*</span>", unsafe_allow_html=True)
+            st.markdown(f"-  No ritmo atual, você atingiria a meta em aproximadamente: {dias_atingir_meta:.0f} dias", unsafe_allow_html=True)
+
+        with col_dist:
+            st.markdown("### ⏰ Sugestão por Turno")
+            por_turno = filtro_cubo.groupby(
+                classificar_periodo(filtro_cubo['Hora_int'].to_numpy('float64', na_value=float('nan')))
+            )[['Corridas', 'Valor']].sum()
+            distrib_turno = por_turno['Corridas'] / por_turno['Corridas'].sum() * 100
+            corridas_turno_real = por_turno['Corridas'] / dias_para_meta if dias_para_meta > 0 else 0
+            faturamento_turno_real = por_turno['Valor'] / dias_para_meta if dias_para_meta > 0 else 0
+            for turno in ['Manhã', 'Tarde', 'Noite']:
+                perc = distrib_turno.get(turno, 0)
+                qtd_turno = (corridas_necessarias_dia * perc / 100)
+                real_corridas = corridas_turno_real.get(turno, 0)
+                real_fat = faturamento_turno_real.get(turno, 0)
+                st.markdown(
+                    f"- **{turno}:** ~{qtd_turno:.1f} corridas/dia ({perc:.0f}%) "
+                    f"<span style='color:gray; font-style:italic;'>(No momento você faz: {real_corridas:.1f} corridas/dia, {formatar_moeda(real_fat)}/dia)</span>",
+                    unsafe_allow_html=True
+                )
+
+        delta_meta = faturamento_medio_atual - meta_dia
+        atingivel = delta_meta >= 0
+        if atingivel:
+            st.success("✅ Sua meta é possível com base no seu desempenho atual! Continue assim! 💪")
+        else:
+            st.error("❌ Sua meta é desafiadora no ritmo atual. Considere ajustar os dias ou melhorar o faturamento médio.")
+
+        # Simulação: sorteia dias reais do período filtrado em vez de projetar só pela média
+        if st.checkbox("🎲 Simular cenários (Monte Carlo)", key="simulacao_meta") and not filtro_cubo.empty:
+            caminhos = st.select_slider(
+                "Quantidade de cenários simulados:",
+                options=[1_000, 10_000, 100_000],
+                value=CAMINHOS_PADRAO,
+                format_func=lambda n: f"{n:,}".replace(',', '.')
+            )
+            simulacao = perfil_secao.cache(
+                'simular_meta_periodo', simular_meta_periodo,
+                assinatura, data_inicio, data_fim, meta_valor, int(dias_para_meta), caminhos
+            )
             st.markdown(
-                f"- **{turno}:** ~{qtd_turno:.1f} corridas/dia ({perc:.0f}%) "
-                f"<span style='color:gray; font-style:italic;'>(No momento você faz: {real_corridas:.1f} corridas/dia, {formatar_moeda(real_fat)}/dia)</span>",
-                unsafe_allow_html=True
+                f"Cada cenário sorteia {int(dias_para_meta)} dias trabalhados do período filtrado "
+                "(com o faturamento de cada turno daquele dia) e soma o faturamento."
             )
+            col_prob, col_dia_meta = st.columns(2)
+            col_prob.metric("Chance de atingir a meta", formatar_percentuais([simulacao['probabilidade'] * 100])[0])
+            if simulacao['dia_meta_mediano'] is not None:
+                col_dia_meta.metric("Dia em que a meta é atingida (mediana)", f"{simulacao['dia_meta_mediano']:.0f}º dia")
+
+            bandas = simulacao['bandas']
+            dias_marcados = simulacao['dias_marcados']
+            fig_sim = go.Figure()
+            fig_sim.add_trace(go.Scatter(x=dias_marcados, y=bandas[95], line=dict(width=0), showlegend=False, hoverinfo="skip"))
+            fig_sim.add_trace(go.Scatter(
+                x=dias_marcados, y=bandas[5], fill="tonexty", fillcolor="rgba(31,119,180,0.15)",
+                line=dict(width=0), name="90% dos cenários"
+            ))
+            fig_sim.add_trace(go.Scatter(x=dias_marcados, y=bandas[75], line=dict(width=0), showlegend=False, hoverinfo="skip"))
+            fig_sim.add_trace(go.Scatter(
+                x=dias_marcados, y=bandas[25], fill="tonexty", fillcolor="rgba(31,119,180,0.35)",
+                line=dict(width=0), name="50% dos cenários"
+            ))
+            fig_sim.add_trace(go.Scatter(x=dias_marcados, y=bandas[50], line=dict(color="#1f77b4"), name="Mediana"))
+            fig_sim.add_hline(y=meta_valor, line_dash="dash", line_color="red", annotation_text="Meta")
+            fig_sim.update_layout(
+                title="Faturamento acumulado simulado",
+                xaxis_title="Dia",
+                yaxis_title="R$",
+                hovermode="x unified"
+            )
+            st.plotly_chart(fig_sim, use_container_width=True)
 
-    delta_meta = faturamento_medio_atual - meta_dia
-    atingivel = delta_meta >= 0
-    if atingivel:
-        st.success("✅ Sua meta é possível com base no seu desempenho atual! Continue assim! 💪")
-    else:
-        st.error("❌ Sua meta é desafiadora no ritmo atual. Considere ajustar os dias ou melhorar o faturamento médio.")
+            if simulacao['turnos_sucesso'] is not None:
+                st.markdown("Nos cenários em que a meta é atingida, o faturamento médio por dia em cada turno é:")
+                for turno, valor_turno in zip(TURNOS, simulacao['turnos_sucesso']):
+                    st.markdown(f"- **{turno}:** {formatar_moeda(valor_turno)}/dia")
+
+secao_calculadora(assinatura, filtro_corridas, filtro_dia, filtro_cubo, data_inicio, data_fim, mediana_valor)
+
+# =========================
+# Perfil de desempenho (depuração)
+# =========================
+
+registro_perfil = perfil.finalizar()
+historico_perfil = registrar_perfil(registro_perfil)
+
+st.sidebar.markdown("---")
+if st.sidebar.checkbox("⏱️ Mostrar perfil de desempenho", value=False, key="depurar_perfil"):
+    with st.sidebar.expander("Perfil da última execução", expanded=True):
+        st.caption(f"Total: {registro_perfil['total_ms']:.0f} ms")
+        st.dataframe(tabela_secoes(registro_perfil), hide_index=True, use_container_width=True)
+        st.caption(f"Últimas {len(historico_perfil)} execuções da sessão")
+        st.dataframe(resumo_historico(historico_perfil), hide_index=True, use_container_width=True)
+        cache = CACHE.estatisticas()
+        st.caption(
+            f"Cache compartilhado: {cache['itens']} itens, {cache['ocupado_mb']:.1f} de {cache['limite_mb']:.0f} MB, "
+            f"{cache['acertos']} acertos, {cache['falhas']} falhas, {cache['descartes']} descartes"
+        )
+        st.download_button(
+            "Baixar log (JSON)",
+            data=exportar_historico(historico_perfil),
+            file_name="perfil_painel.jsonl",
+            mime="application/json"
+        )
 
 # =========================
 # Desenvolvido por TR1
@@ -102,6 +102,63 @@ Analisar o lucro líquido, e não apenas o faturamento, evita uma falsa percepç
 - Faturamento Bruto: **R$ 12,69** (corrida de 3 km)  
 - Custo Operacional: **R$ 1,50**  
 - **Lucro Líquido**: **R$ 11,19**
+"""
+    },
+    {
+        "titulo": "🧾 Faturamento Ajustado",
+        "explicacao": """
+**Definição**:  
+É o faturamento bruto corrigido pelos lançamentos de ajustes_cancelamentos.xlsx: soma os ajustes de valor e as taxas de cancelamento recebidas e desconta o valor das corridas canceladas que constam na base de corridas.
+
+**Fórmula:**  
+`Faturamento Ajustado = Faturamento Bruto + Ajustes + Taxas de Cancelamento - Corridas Canceladas`
+
+**Dica**:  
+Sem a planilha de ajustes, o faturamento ajustado é igual ao bruto.
+""",
+        "exemplo": """
+**Exemplo real:**  
+- Faturamento Bruto na semana: **R$ 850,00**  
+- Um ajuste de **-R$ 4,00** e uma corrida de **R$ 18,00** cancelada com taxa de **R$ 5,00**  
+- **Faturamento Ajustado**: 850,00 - 4,00 + 5,00 - 18,00 = **R$ 833,00**
+"""
+    },
+    {
+        "titulo": "🚫 Taxa de Cancelamento",
+        "explicacao": """
+**Definição**:  
+Percentual das solicitações que terminaram canceladas. As solicitações são as corridas da base mais os cancelamentos que não aparecem nela.
+
+**Fórmula:**  
+`Taxa de Cancelamento = Cancelamentos / Solicitações × 100`
+
+**Para que serve?**  
+Uma taxa subindo de um mês para o outro (veja o MoM) pode indicar horários ou regiões com mais desistências.
+""",
+        "exemplo": """
+**Exemplo real:**  
+- No mês, **95 corridas** na base e **5 cancelamentos** fora dela → 100 solicitações  
+- **Taxa de Cancelamento**: 5 / 100 × 100 = **5,0%**
+"""
+    },
+    {
+        "titulo": "⛽ Lucro Líquido e Custo por KM no Tempo",
+        "explicacao": """
+**Definição**:  
+No gráfico de lucro, cada lançamento de custos é distribuído pelos KM rodados desde a sua data até o próximo lançamento do mesmo tipo (ex.: um abastecimento vale até o abastecimento seguinte).
+- **Lucro Líquido do período**: faturamento bruto do dia, semana ou mês menos os custos rateados para ele.
+- **Custo por KM**: custos rateados do período divididos pelos KM rodados nele.
+
+**Fórmula:**  
+`Custo por KM = Custos Rateados / KM Rodados`
+
+**Dica**:  
+Um custo por KM subindo sem aumento no preço do combustível pode indicar manutenção acima do normal ou consumo maior do carro.
+""",
+        "exemplo": """
+**Exemplo real:**  
+- Abastecimento de **R$ 250,00** no dia 01 e o próximo no dia 06, com **500 km** rodados entre eles → **R$ 0,50/km**  
+- Num dia desse intervalo com **120 km** e **R$ 280,00** de faturamento, o custo rateado é **R$ 60,00** e o lucro líquido, **R$ 220,00**
 """
     },
     {
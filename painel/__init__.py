@@ -0,0 +1 @@
+# Módulos de apoio do Painel Uber (carregamento, cache e cálculos)
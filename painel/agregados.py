@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+from painel.calendario import adicionar_mes_semana
+
+# =========================
+# Cubo diário (Data x Hora_int)
+# =========================
+
+# Colunas somáveis do cubo; as medianas exatas continuam saindo das corridas
+# (Valor2 é a soma dos quadrados, para média e desvio padrão sem voltar às corridas)
+COLUNAS_CUBO = ['Valor', 'Valor2', 'Corridas', 'Duracao', 'KM']
+
+def montar_cubo(df_corridas):
+    # Uma linha por (Data, Hora_int) com somas e contagem. Montado uma vez por versão da base:
+    # os filtros e as seções passam a trabalhar com dias x horas, não com corridas.
+    # dropna=False mantém corridas sem hora conhecida nos totais. As somas são em float64/int64,
+    # mesmo com as corridas guardadas em float32 e int32.
+    valor = df_corridas['Valor'].astype('float64')
+    return df_corridas[['Data', 'Hora_int']].assign(
+        Valor=valor,
+        Valor2=valor ** 2,
+        Duracao=df_corridas['Duracao'].astype('int64'),
+        KM=df_corridas['KM'].astype('float64')
+    ).groupby(
+        ['Data', 'Hora_int'], dropna=False, sort=True
+    ).agg(
+        Valor=('Valor', 'sum'),
+        Valor2=('Valor2', 'sum'),
+        Corridas=('Valor', 'size'),
+        Duracao=('Duracao', 'sum'),
+        KM=('KM', 'sum')
+    ).reset_index()
+
+def agregar_por_dia(cubo):
+    # Soma o cubo até o nível de dia, já com as chaves Mes e Semana das tabelas MoM/WoW
+    por_dia = cubo.groupby('Data', sort=True)[COLUNAS_CUBO].sum().reset_index()
+    return adicionar_mes_semana(por_dia)
+
+def somar_por_periodo(por_dia, periodo_col, colunas=('Valor', 'Corridas')):
+    # Uma passada só (bincount) sobre o agregado diário: soma de cada coluna por período e,
+    # havendo Valor e Corridas, faturamento x corridas, base das médias por dia e por corrida
+    periodos, posicoes = np.unique(por_dia[periodo_col].to_numpy(), return_inverse=True)
+    somas = {
+        coluna: np.bincount(posicoes, weights=por_dia[coluna].to_numpy('float64'), minlength=len(periodos))
+        for coluna in colunas
+    }
+    if 'Valor' in somas and 'Corridas' in somas:
+        somas['Valor_x_Corridas'] = np.bincount(
+            posicoes,
+            weights=por_dia['Valor'].to_numpy('float64') * por_dia['Corridas'].to_numpy('float64'),
+            minlength=len(periodos)
+        )
+    return pd.DataFrame({periodo_col: periodos, **somas})
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+from painel.calendario import adicionar_mes_semana
+
+# =========================
+# Ajustes e cancelamentos
+# =========================
+# Cada linha de ajustes_cancelamentos.xlsx é um ajuste (Valor = diferença no valor da corrida)
+# ou um cancelamento (Valor = taxa recebida). Quando a planilha traz Hora e Link, a linha é
+# ligada à corrida correspondente; só com a Data, o efeito é contado apenas no dia.
+
+COLUNAS_CHAVE = ['Data', 'Hora_seg', 'Link']
+COLUNAS_AJUSTES = ['Ajustes', 'Cancelamentos', 'Cancelamentos_avulsos']
+
+def chaves_comuns(df_corridas, df_ajustes):
+    return [coluna for coluna in COLUNAS_CHAVE if coluna in df_corridas.columns and coluna in df_ajustes.columns]
+
+def _momentos(df, chaves):
+    # Data (+ Hora_seg) como um int64 em segundos, para comparações numéricas baratas
+    momentos = df['Data'].to_numpy('datetime64[s]').astype('int64')
+    if 'Hora_seg' in chaves:
+        momentos = momentos + df['Hora_seg'].to_numpy('int64', na_value=-1)
+    return momentos
+
+def casar_ajustes(df_corridas, df_ajustes):
+    # Posição (iloc) da corrida de cada ajuste, ou -1 se não houver. As corridas candidatas
+    # (mesma data e hora de algum ajuste) são separadas por uma comparação numérica e só elas
+    # entram no índice hash com todas as chaves; nada é comparado linha a linha.
+    chaves = chaves_comuns(df_corridas, df_ajustes)
+    if len(chaves) < 2:  # só a Data não identifica uma corrida
+        return np.full(len(df_ajustes), -1, dtype='int64')
+    candidatas = np.flatnonzero(np.isin(_momentos(df_corridas, chaves), _momentos(df_ajustes, chaves)))
+    indice = pd.MultiIndex.from_frame(df_corridas[chaves].iloc[candidatas])
+    unicas = ~indice.duplicated()  # corridas repetidas: vale a primeira
+    posicoes = candidatas[unicas]
+    achadas = indice[unicas].get_indexer(pd.MultiIndex.from_frame(df_ajustes[chaves]))
+    return np.where(achadas >= 0, posicoes[achadas], -1)
+
+def ajustes_por_dia(df_corridas, df_ajustes):
+    # Uma linha por dia com ajuste, ordenada por Data e já com Mes/Semana:
+    # - Ajustes: variação do faturamento (ajustes + taxas de cancelamento - valor das
+    #   corridas canceladas que constam na base de corridas)
+    # - Cancelamentos, e Cancelamentos_avulsos: os que não estão na base de corridas
+    #   e por isso somam às solicitações na taxa de cancelamento
+    posicoes = casar_ajustes(df_corridas, df_ajustes)
+    casadas = posicoes >= 0
+    cancelamento = (df_ajustes['Tipo'].str.strip().str.lower() == 'cancelamento').to_numpy(bool, na_value=False)
+    valor_corrida = np.zeros(len(df_ajustes))
+    valor_corrida[casadas] = df_corridas['Valor'].to_numpy('float64')[posicoes[casadas]]
+    variacao = df_ajustes['Valor'].to_numpy('float64', na_value=0.0) - np.where(cancelamento, valor_corrida, 0.0)
+
+    dias, dia = np.unique(df_ajustes['Data'].to_numpy(), return_inverse=True)
+    return adicionar_mes_semana(pd.DataFrame({
+        'Data': dias,
+        'Ajustes': np.bincount(dia, weights=variacao, minlength=len(dias)),
+        'Cancelamentos': np.bincount(dia, weights=cancelamento, minlength=len(dias)).astype('int64'),
+        'Cancelamentos_avulsos': np.bincount(dia, weights=cancelamento & ~casadas, minlength=len(dias)).astype('int64')
+    }))
+
+def taxa_cancelamento(cancelamentos, corridas, avulsos):
+    # Cancelamentos / solicitações (corridas + cancelamentos fora da base de corridas), em %
+    solicitacoes = np.asarray(corridas + avulsos, dtype='float64')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(solicitacoes > 0, cancelamentos / solicitacoes * 100, np.nan)
@@ -0,0 +1,81 @@
+import argparse
+import subprocess
+import sys
+import time
+
+from painel import dados
+
+# =========================
+# Aquecimento do servidor
+# =========================
+# Uso: python -m painel.aquecimento [pasta] [--importacoes]
+# Para rodar no boot de uma instância nova, antes do `streamlit run` (ex.: no comando do
+# contêiner): ingere as planilhas no cache Parquet de <pasta>/.cache e importa os módulos
+# do painel (gravando os .pyc). Assim a primeira sessão lê o Parquet em vez do Excel.
+# Com --importacoes, mostra quanto cada biblioteca custa para importar num processo novo.
+
+# Na ordem em que o Dashboard importa; os adiados só são carregados nas seções que os usam
+MODULOS_INICIO = [
+    'streamlit', 'numpy', 'pandas', 'plotly.graph_objects', 'pyarrow.parquet', 'pyarrow.dataset',
+    'painel.cache', 'painel.dados', 'painel.metricas', 'painel.motor', 'painel.particoes', 'painel.simulacao',
+    'painel.vigia'
+]
+MODULOS_ADIADOS = ['plotly.express', 'openpyxl', 'duckdb']
+
+
+def medir_importacoes(modulos=MODULOS_INICIO + MODULOS_ADIADOS):
+    # Tempo (ms) de cada importação num interpretador novo, já com os módulos anteriores da
+    # lista importados: é o custo a mais de cada um no início de um processo (None se faltar)
+    codigo = (
+        'import importlib, sys, time\n'
+        'for nome in sys.argv[1:]:\n'
+        '    inicio = time.perf_counter()\n'
+        '    try:\n'
+        '        importlib.import_module(nome)\n'
+        '    except ImportError:\n'
+        '        print(nome, -1)\n'
+        '        continue\n'
+        '    print(nome, (time.perf_counter() - inicio) * 1000)\n'
+    )
+    saida = subprocess.run(
+        [sys.executable, '-c', codigo, *modulos], capture_output=True, text=True, check=True
+    ).stdout
+    tempos = {}
+    for linha in saida.splitlines():
+        nome, ms = linha.rsplit(' ', 1)
+        tempos[nome] = None if float(ms) < 0 else float(ms)
+    return tempos
+
+
+def aquecer(pasta=dados.PASTA_BASE):
+    # Lê as bases pelo mesmo caminho do painel (gravando o cache Parquet) e importa os módulos
+    # que o painel carrega no início; retorna (corridas, segundos)
+    inicio = time.perf_counter()
+    df_corridas, _, _ = dados.carregar_bases(pasta)
+    for modulo in MODULOS_INICIO:
+        if modulo.startswith('painel.'):
+            __import__(modulo)
+    return len(df_corridas), time.perf_counter() - inicio
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description='Prepara os caches do Painel Uber antes do primeiro acesso')
+    parser.add_argument('pasta', nargs='?', default=dados.PASTA_BASE, help='pasta com as planilhas (padrão: PAINEL_BASE)')
+    parser.add_argument('--importacoes', action='store_true', help='mede o tempo de importação das bibliotecas')
+    args = parser.parse_args(argumentos)
+
+    if args.importacoes:
+        tempos = medir_importacoes()
+        for modulo, ms in tempos.items():
+            momento = 'adiado' if modulo in MODULOS_ADIADOS else 'início'
+            print(f'{modulo:<24} {momento:<8} {"-" if ms is None else f"{ms:.1f} ms":>10}')
+        inicio = sum(ms or 0 for modulo, ms in tempos.items() if modulo in MODULOS_INICIO)
+        print(f'Total antes da primeira seção: {inicio:.0f} ms')
+
+    corridas, segundos = aquecer(args.pasta)
+    print(f'{corridas} corridas prontas em {segundos * 1000:.0f} ms ({args.pasta})')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,199 @@
+import argparse
+import json
+import os
+import pickle
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from painel import dados, sintetico
+from painel.agregados import agregar_por_dia, montar_cubo
+from painel.ajustes import ajustes_por_dia
+from painel.custos import lucro_diario, lucro_por_periodo
+from painel.simulacao import faturamento_dia_turno, simular_meta
+from painel.metricas import (
+    calcular_rentabilidade, curva_pareto, gerar_tabela_momwow, matriz_calor, resumo_dias_semana
+)
+
+# =========================
+# Benchmark das etapas do painel
+# =========================
+# Uso: python -m painel.benchmark --tamanhos 10000 100000 1000000 --saida benchmark.json
+#      python -m painel.benchmark --comparar benchmark_anterior.json
+# Cada etapa roda `repeticoes` vezes (vale o menor tempo) e mais uma vez com tracemalloc
+# para medir o pico de memória alocado por ela.
+
+TAMANHOS_PADRAO = [10_000, 100_000, 1_000_000]
+LIMITE_EXCEL_PADRAO = 50_000  # gravar xlsx grandes com openpyxl leva minutos
+
+
+def _medir(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    del resultado
+
+    tracemalloc.start()
+    try:
+        funcao()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(tempos), pico / 2**20
+
+
+def medir_memoria(df_original, df_compacto):
+    # MB em memória e serializados (o que o st.cache_data copia a cada sessão), antes e depois
+    # do esquema compacto; o DataFrame do painel fica sem a coluna Link
+    return {
+        'memoria_antes_mb': round(dados.memoria_mb(df_original), 3),
+        'memoria_depois_mb': round(dados.memoria_mb(df_compacto), 3),
+        'pickle_antes_mb': round(len(pickle.dumps(df_original)) / 2**20, 3),
+        'pickle_depois_mb': round(len(pickle.dumps(df_compacto)) / 2**20, 3)
+    }
+
+
+def etapas_do_painel(linhas, pasta, limite_excel, anos=sintetico.ANOS_PADRAO):
+    # Monta as bases sintéticas e devolve (etapas na ordem em que o Dashboard as executa,
+    # memória das corridas antes e depois do esquema compacto)
+    bruto = sintetico.gerar_corridas(linhas, anos=anos)
+    df_custos = sintetico.gerar_custos(bruto)
+    df_ajustes = sintetico.gerar_ajustes(bruto)
+    df_original = dados.preprocessar_corridas(dados.tipar_corridas(bruto.copy()))
+    df_corridas = dados.compactar_corridas(df_original)
+    memoria = medir_memoria(df_original, df_corridas.drop(columns='Link'))
+    del df_original
+    df_ajustes_tipado = dados.tipar_ajustes(df_ajustes.astype(dados.TIPOS_AJUSTES))
+    cubo = montar_cubo(df_corridas)
+    por_dia = agregar_por_dia(cubo)
+    receita_total = df_corridas['Valor'].sum()
+    fim = df_corridas['Data'].iloc[-1]
+    inicio = fim - pd.Timedelta(days=30)
+    parquet = os.path.join(pasta, f'corridas_{linhas}.parquet')
+    assinatura = {'linhas': linhas}
+
+    etapas = {}
+    if linhas <= limite_excel:
+        sintetico.salvar_excel(pasta, bruto, df_custos, df_ajustes)
+        etapas['excel'] = lambda: dados.ler_corridas_excel(os.path.join(pasta, 'corridas_uber.xlsx'))
+    etapas.update({
+        'preprocessamento': lambda: dados.compactar_corridas(dados.preprocessar_corridas(dados.tipar_corridas(bruto.copy()))),
+        'parquet_gravar': lambda: dados._gravar_cache(df_corridas, parquet, assinatura),
+        'parquet_ler': lambda: dados._ler_cache(parquet),
+        'ordenar': lambda: dados.ordenar_por_data(df_corridas.sample(frac=1, random_state=0)),
+        'cubo': lambda: agregar_por_dia(montar_cubo(df_corridas)),
+        'ajustes': lambda: ajustes_por_dia(df_corridas, df_ajustes_tipado),
+        'lucro': lambda: lucro_por_periodo(lucro_diario(por_dia, df_custos), 'Semana'),
+        'filtro': lambda: (
+            dados.fatiar_periodo(df_corridas, inicio, fim),
+            dados.fatiar_periodo(cubo, inicio, fim)
+        ),
+        'momwow': lambda: (
+            gerar_tabela_momwow(por_dia, 'Mes', 'Valor', 'Faturamento', '%b/%y', 'mês'),
+            gerar_tabela_momwow(por_dia, 'Semana', 'Valor', 'Faturamento', '%d/%m/%y', 'semana')
+        ),
+        'calor': lambda: matriz_calor(cubo),
+        'rentabilidade': lambda: calcular_rentabilidade(df_corridas),
+        'pareto': lambda: curva_pareto(df_corridas['Valor'].to_numpy(), receita_total),
+        'simulacao': lambda: simular_meta(
+            faturamento_dia_turno(dados.fatiar_periodo(cubo, inicio, fim)), receita_total / 10, 30, 100_000
+        ),
+        'revisao_semanal': lambda: resumo_dias_semana(df_corridas),
+    })
+    return etapas, memoria
+
+
+def executar(tamanhos, repeticoes=3, limite_excel=LIMITE_EXCEL_PADRAO, etapas_escolhidas=None,
+             anos=sintetico.ANOS_PADRAO):
+    resultados = []
+    memorias = []
+    with tempfile.TemporaryDirectory() as pasta:
+        for linhas in tamanhos:
+            etapas, memoria = etapas_do_painel(linhas, pasta, limite_excel, anos)
+            memorias.append({'linhas': linhas, **memoria})
+            print(
+                f"{linhas:>10} {'memoria':<18} {memoria['memoria_antes_mb']:>8.1f} -> {memoria['memoria_depois_mb']:.1f} MB"
+                f"  (pickle {memoria['pickle_antes_mb']:.1f} -> {memoria['pickle_depois_mb']:.1f} MB)", flush=True
+            )
+            for etapa, funcao in etapas.items():
+                if etapas_escolhidas and etapa not in etapas_escolhidas:
+                    continue
+                segundos, pico_mb = _medir(funcao, repeticoes)
+                resultados.append({
+                    'linhas': linhas,
+                    'etapa': etapa,
+                    'segundos': round(segundos, 6),
+                    'pico_mb': round(pico_mb, 3)
+                })
+                print(f'{linhas:>10} {etapa:<18} {segundos * 1000:>10.1f} ms {pico_mb:>10.1f} MB', flush=True)
+    return {
+        'ambiente': {
+            'data': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'maquina': platform.platform(),
+            'cpus': os.cpu_count()
+        },
+        'repeticoes': repeticoes,
+        'anos': anos,
+        'resultados': resultados,
+        'memoria': memorias
+    }
+
+
+def comparar(atual, anterior, tolerancia):
+    # Lista as etapas que ficaram mais de `tolerancia` (fração) mais lentas que na execução anterior
+    anteriores = {(r['linhas'], r['etapa']): r for r in anterior['resultados']}
+    regressoes = []
+    for resultado in atual['resultados']:
+        base = anteriores.get((resultado['linhas'], resultado['etapa']))
+        if base is None or base['segundos'] <= 0:
+            continue
+        razao = resultado['segundos'] / base['segundos']
+        marca = ' <- regressão' if razao > 1 + tolerancia else ''
+        print(f"{resultado['linhas']:>10} {resultado['etapa']:<18} {razao:>6.2f}x{marca}")
+        if marca:
+            regressoes.append(resultado)
+    return regressoes
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description='Benchmark das etapas do Painel Uber com bases sintéticas')
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=TAMANHOS_PADRAO,
+                        help='quantidades de corridas (ex.: 10000 100000 1000000 10000000)')
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--etapas', nargs='+', help='roda só as etapas informadas')
+    parser.add_argument('--limite-excel', type=int, default=LIMITE_EXCEL_PADRAO,
+                        help='maior base para a qual a leitura do xlsx também é medida')
+    parser.add_argument('--anos', type=float, default=sintetico.ANOS_PADRAO,
+                        help='período máximo das bases sintéticas; acima dele cresce o número de corridas por dia')
+    parser.add_argument('--saida', default='benchmark.json', help='arquivo JSON com os resultados')
+    parser.add_argument('--comparar', help='JSON de uma execução anterior para detectar regressões')
+    parser.add_argument('--tolerancia', type=float, default=0.2,
+                        help='fração de lentidão aceita antes de acusar regressão (padrão 0.2 = 20%%)')
+    args = parser.parse_args(argumentos)
+
+    atual = executar(args.tamanhos, args.repeticoes, args.limite_excel, args.etapas, args.anos)
+    with open(args.saida, 'w', encoding='utf-8') as arquivo:
+        json.dump(atual, arquivo, ensure_ascii=False, indent=2)
+    print(f'Resultados gravados em {args.saida}')
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as arquivo:
+            anterior = json.load(arquivo)
+        if comparar(atual, anterior, args.tolerancia):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,155 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+import numpy as np
+import pandas as pd
+
+from painel.perfil import registrar_falha_cache
+
+# =========================
+# Cache compartilhado entre sessões
+# =========================
+# Um cache por processo do servidor para as bases e os resultados derivados (cubo, lucro,
+# tabelas MoM/WoW, mapa de calor...), com chave (função, versão das bases, período, métrica).
+# Diferente do st.cache_data, nada é serializado nem copiado num acerto: todas as sessões
+# recebem vistas do mesmo objeto. Os itens menos usados saem quando a memória passa de
+# PAINEL_CACHE_MB, e sessões que pedem a mesma chave ao mesmo tempo esperam um único cálculo.
+# Os itens cuja chave é só (função, versão), isto é, as bases e os agregados de uma versão
+# fixada pela vigia (painel.vigia), nunca são descartados: os resultados por período que
+# faltarem partem deles sem reler as planilhas no caminho da sessão. Funções memorizadas com
+# fixavel=False (ex.: os esboços de quantis, grandes e recalculáveis das bases) ficam de fora.
+
+LIMITE_MB = float(os.environ.get('PAINEL_CACHE_MB', 512))
+
+
+def tamanho_bytes(valor):
+    # Memória aproximada de um resultado (DataFrames, arrays e tuplas/listas/dicionários deles)
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        uso = valor.memory_usage(deep=True)
+        return int(uso.sum() if isinstance(valor, pd.DataFrame) else uso)
+    if isinstance(valor, np.ndarray):
+        return valor.nbytes
+    if isinstance(valor, (tuple, list)):
+        return sum(tamanho_bytes(item) for item in valor)
+    if isinstance(valor, dict):
+        return sum(tamanho_bytes(item) for item in valor.values())
+    return sys.getsizeof(valor)
+
+def somente_leitura(valor):
+    # Vista do resultado guardado: DataFrames rasos e arrays sem escrita. Com o Copy-on-Write do
+    # pandas 3, uma alteração feita por uma sessão copia só o que mudou e nunca chega ao cache
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        return valor.copy(deep=False)
+    if isinstance(valor, np.ndarray):
+        vista = valor.view()
+        vista.flags.writeable = False
+        return vista
+    if isinstance(valor, tuple):
+        return tuple(somente_leitura(item) for item in valor)
+    if isinstance(valor, list):
+        return [somente_leitura(item) for item in valor]
+    if isinstance(valor, dict):
+        return {chave: somente_leitura(item) for chave, item in valor.items()}
+    return valor
+
+
+class CacheCompartilhado:
+    def __init__(self, limite_mb=LIMITE_MB):
+        self.limite = int(limite_mb * 2**20)
+        self.ocupado = 0
+        self.acertos = 0
+        self.falhas = 0
+        self.descartes = 0
+        self._itens = OrderedDict()  # chave -> (valor, bytes), do menos para o mais usado
+        self._calculando = {}  # chave -> threading.Event do cálculo em andamento
+        self._versoes_fixas = frozenset()
+        self._nao_fixaveis = set()  # nomes de funções que seguem o limite mesmo na versão fixa
+        self._trava = threading.Lock()
+
+    def obter(self, chave, funcao, *args):
+        # Devolve (vista do resultado, se foi acerto). Se outra sessão já está calculando a
+        # mesma chave, espera por ela; se aquele cálculo falhar, esta sessão tenta de novo
+        while True:
+            with self._trava:
+                if chave in self._itens:
+                    self._itens.move_to_end(chave)
+                    self.acertos += 1
+                    return somente_leitura(self._itens[chave][0]), True
+                evento = self._calculando.get(chave)
+                if evento is None:
+                    evento = self._calculando[chave] = threading.Event()
+                    self.falhas += 1
+                    break
+            evento.wait()
+        try:
+            valor = funcao(*args)
+            self._guardar(chave, valor)
+        finally:
+            with self._trava:
+                del self._calculando[chave]
+            evento.set()
+        return somente_leitura(valor), False
+
+    def _fixo(self, chave):
+        return len(chave) == 2 and chave[1] in self._versoes_fixas and chave[0] not in self._nao_fixaveis
+
+    def fixar_versoes(self, versoes):
+        # Versões cujas bases e agregados ficam no cache até a próxima chamada
+        with self._trava:
+            self._versoes_fixas = frozenset(versoes)
+
+    def nao_fixar(self, nome):
+        with self._trava:
+            self._nao_fixaveis.add(nome)
+
+    def _guardar(self, chave, valor):
+        # Itens maiores que o limite inteiro não são guardados (a sessão usa e descarta), exceto os fixos
+        tamanho = tamanho_bytes(valor)
+        with self._trava:
+            fixo = self._fixo(chave)
+            if tamanho > self.limite and not fixo:
+                return
+            self._itens[chave] = (valor, tamanho)
+            self.ocupado += tamanho
+            # Descarta dos menos usados para os mais usados, pulando os fixos
+            for antiga in list(self._itens):
+                if self.ocupado <= self.limite:
+                    break
+                if antiga == chave or self._fixo(antiga):
+                    continue
+                _, liberado = self._itens.pop(antiga)
+                self.ocupado -= liberado
+                self.descartes += 1
+
+    def estatisticas(self):
+        with self._trava:
+            return {
+                'itens': len(self._itens),
+                'ocupado_mb': round(self.ocupado / 2**20, 1),
+                'limite_mb': round(self.limite / 2**20, 1),
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'descartes': self.descartes
+            }
+
+
+CACHE = CacheCompartilhado()
+
+
+def memorizar(nome, cache=CACHE, fixavel=True):
+    # Decorador no lugar do st.cache_data: os argumentos (hasheáveis) são a chave e as
+    # falhas são anotadas no Perfil da sessão que fez o cálculo
+    if not fixavel:
+        cache.nao_fixar(nome)
+    def decorador(funcao):
+        @wraps(funcao)
+        def memorizada(*args):
+            valor, acerto = cache.obter((nome, *args), funcao, *args)
+            if not acerto:
+                registrar_falha_cache(nome)
+            return valor
+        return memorizada
+    return decorador
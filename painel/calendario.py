@@ -0,0 +1,34 @@
+import numpy as np
+
+# =========================
+# Chaves de calendário (dia, semana, mês)
+# =========================
+# Aritmética direta em datetime64, sem pandas Period nem lambda por linha.
+# Todas as funções devolvem arrays na mesma unidade das datas de entrada.
+
+def _em_dias(datas):
+    datas = np.asarray(datas)
+    return datas, datas.astype('datetime64[D]')
+
+def dia(datas):
+    datas, dias = _em_dias(datas)
+    return dias.astype(datas.dtype)
+
+def inicio_semana(datas):
+    # Semana de segunda a domingo (igual a to_period('W')). 1970-01-01 foi uma quinta-feira,
+    # então (dias + 3) % 7 é a quantidade de dias desde a segunda-feira
+    datas, dias = _em_dias(datas)
+    numeros = dias.astype('int64')
+    segundas = (numeros - (numeros + 3) % 7).astype('datetime64[D]')
+    return np.where(np.isnat(dias), dias, segundas).astype(datas.dtype)
+
+def inicio_mes(datas):
+    datas, dias = _em_dias(datas)
+    return dias.astype('datetime64[M]').astype(datas.dtype)
+
+def adicionar_mes_semana(df):
+    # Chaves das análises MoM e WoW, calculadas uma vez no carregamento
+    return df.assign(
+        Mes=inicio_mes(df['Data']),
+        Semana=inicio_semana(df['Data'])
+    )
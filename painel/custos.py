@@ -0,0 +1,64 @@
+import numpy as np
+
+from painel.agregados import somar_por_periodo
+
+# =========================
+# Rateio dos custos e lucro líquido por período
+# =========================
+# Cada lançamento de gasolina.xlsx (abastecimento, manutenção...) é distribuído pelos KM
+# rodados desde a sua data até o próximo lançamento do mesmo Tipo. A busca do lançamento
+# vigente em cada dia é um as-of (searchsorted) e as somas são bincount: tudo linear no
+# número de dias e de lançamentos, sem laço por dia.
+
+COLUNAS_LUCRO = ['Valor', 'Custos', 'KM', 'Lucro']
+
+def _ratear_tipo(datas_dias, km_dias, datas_custos, valores_custos):
+    # Custo de cada dia para um único Tipo de lançamento
+    inicios, lancamento = np.unique(datas_custos, return_inverse=True)
+    valores = np.bincount(lancamento, weights=valores_custos, minlength=len(inicios))
+    # Trecho vigente de cada dia: último lançamento com data <= dia (-1 antes do primeiro)
+    trecho = np.searchsorted(inicios, datas_dias, side='right') - 1
+    validos = trecho >= 0
+    km_trechos = np.bincount(trecho[validos], weights=km_dias[validos], minlength=len(inicios))
+
+    # Trechos sem KM rodado passam o custo para o próximo trecho com KM (ou o último, no fim da base)
+    com_km = np.flatnonzero(km_trechos > 0)
+    if len(com_km) == 0:
+        return np.zeros(len(datas_dias))
+    destino = np.minimum(np.searchsorted(com_km, np.arange(len(inicios))), len(com_km) - 1)
+    valores = np.bincount(com_km[destino], weights=valores, minlength=len(inicios))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        custo_por_km = np.where(km_trechos > 0, valores / km_trechos, 0.0)
+    return np.where(validos, custo_por_km[trecho] * km_dias, 0.0)
+
+def ratear_custos(por_dia, df_custos):
+    # Custo rateado de cada dia do agregado diário (mesma ordem de por_dia)
+    datas_dias = por_dia['Data'].to_numpy('datetime64[ns]')
+    km_dias = por_dia['KM'].to_numpy('float64')
+    custos = np.zeros(len(por_dia))
+    tipos = df_custos['Tipo'].astype('string').fillna('').to_numpy()
+    for tipo in np.unique(tipos):
+        do_tipo = tipos == tipo
+        custos += _ratear_tipo(
+            datas_dias, km_dias,
+            df_custos['Data'].to_numpy('datetime64[ns]')[do_tipo],
+            df_custos['Valor'].to_numpy('float64')[do_tipo]
+        )
+    return custos
+
+def lucro_diario(por_dia, df_custos):
+    # Série diária de faturamento, custos rateados e lucro líquido (sobre o faturamento bruto,
+    # como na Visão Geral), com Mes/Semana
+    lucro = por_dia[['Data', 'Mes', 'Semana', 'Valor', 'KM']].assign(
+        Custos=ratear_custos(por_dia, df_custos)
+    )
+    lucro['Lucro'] = lucro['Valor'] - lucro['Custos']
+    lucro['Custo_por_KM'] = lucro['Custos'] / lucro['KM']
+    return lucro
+
+def lucro_por_periodo(lucro_dia, periodo_col):
+    # Mesma série somada por semana ou mês; o custo por KM é recalculado sobre as somas
+    lucro = somar_por_periodo(lucro_dia, periodo_col, COLUNAS_LUCRO)
+    lucro['Custo_por_KM'] = lucro['Custos'] / lucro['KM']
+    return lucro
@@ -0,0 +1,338 @@
+import json
+import os
+from importlib.util import find_spec
+
+import numpy as np
+import pandas as pd
+
+from painel.calendario import adicionar_mes_semana
+
+# O openpyxl só é importado quando há linhas novas para ler (com o cache em dia, nunca)
+TEM_OPENPYXL = find_spec('openpyxl') is not None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # sem pyarrow, lê sempre direto do Excel
+    pa = None
+    pq = None
+
+# =========================
+# Caminhos e versões
+# =========================
+
+# Pasta com as três planilhas; PAINEL_BASE aponta o painel para a pasta de outro motorista
+PASTA_BASE = os.environ.get('PAINEL_BASE', 'basedados')
+NOME_CORRIDAS = 'corridas_uber.xlsx'
+NOME_CUSTOS = 'gasolina.xlsx'
+NOME_AJUSTES = 'ajustes_cancelamentos.xlsx'
+ARQUIVO_CORRIDAS = os.path.join(PASTA_BASE, NOME_CORRIDAS)
+ARQUIVO_CUSTOS = os.path.join(PASTA_BASE, NOME_CUSTOS)
+ARQUIVO_AJUSTES = os.path.join(PASTA_BASE, NOME_AJUSTES)
+PASTA_CACHE = '.cache'  # criada ao lado das planilhas (basedados/.cache)
+
+# Aumente sempre que mudar o formato do DataFrame tipado gravado no cache
+VERSAO_ESQUEMA = 6
+
+TIPOS_CORRIDAS = {
+    'Tipo': 'string',
+    'KM': 'float64',
+    'Duracao': 'int64',
+    'Valor': 'float64',
+    'Link': 'string'
+}
+
+# Hora e Link são opcionais na planilha de ajustes; quando existem, ligam o ajuste à corrida
+TIPOS_AJUSTES = {
+    'Tipo': 'string',
+    'Valor': 'float64',
+    'Link': 'string'
+}
+
+# Colunas que identificam uma corrida na ingestão incremental
+COLUNAS_IMPRESSAO = ['Data', 'Hora_seg', 'Valor', 'Link']
+
+# Nomes dos dias em português, na ordem de dt.dayofweek (0 = segunda)
+dias_semana = np.array([
+    'Segunda-feira', 'Terça-feira', 'Quarta-feira', 'Quinta-feira', 'Sexta-feira', 'Sábado', 'Domingo'
+])
+PERIODOS = ['Manhã', 'Tarde', 'Noite']
+
+# Esquema compacto das corridas em memória e no cache Parquet: categorias para os textos
+# repetidos, float32 para KM e Valor (cerca de 7 algarismos significativos, de sobra para
+# uma corrida) e inteiros pequenos para duração e hora. Somas, médias e desvios são feitos
+# em float64 (agregados.montar_cubo, metricas.resumo_dias_semana, motor).
+TIPOS_COMPACTOS = {
+    'Tipo': 'category',
+    'KM': 'float32',
+    'Valor': 'float32',
+    'Duracao': 'int32',
+    'Hora_seg': 'Int32',
+    'Hora_decimal': 'float32',
+    'Hora_int': 'Int8',
+    'DiaSemana': pd.CategoricalDtype(dias_semana),
+    'Periodo': pd.CategoricalDtype(PERIODOS)
+}
+
+# =========================
+# Leitura das planilhas
+# =========================
+
+def classificar_periodo(horas):
+    # Manhã de 5h a 12h, Tarde de 12h a 18h e o resto (inclusive hora desconhecida) é Noite
+    return np.select(
+        [(horas >= 5) & (horas < 12), (horas >= 12) & (horas < 18)],
+        PERIODOS[:2],
+        default=PERIODOS[2]
+    )
+
+def converter_hora(horas):
+    # Hora da planilha (time, texto 'HH:MM:SS' ou datetime) -> segundos desde a meia-noite
+    texto = horas.astype('string')
+    duracao = pd.to_timedelta(texto, errors='coerce')
+    faltando = duracao.isna() & horas.notna()
+    if faltando.any():
+        # Células salvas como data e hora (ex.: 1900-01-01 00:21:00): fica só a parte do horário
+        momento = pd.to_datetime(texto[faltando], errors='coerce')
+        duracao[faltando] = momento - momento.dt.normalize()
+    return (duracao.dt.total_seconds() // 1).astype('Int32')
+
+def tipar_corridas(df_corridas):
+    df_corridas['Data'] = pd.to_datetime(df_corridas['Data'], dayfirst=True)
+    df_corridas['Hora_seg'] = converter_hora(df_corridas.pop('Hora'))
+    return df_corridas
+
+def preprocessar_corridas(df_corridas):
+    segundos = df_corridas['Hora_seg'].to_numpy('float64', na_value=np.nan)
+    horas = segundos // 3600
+    return adicionar_mes_semana(df_corridas.assign(
+        Hora_decimal=(segundos // 60) / 60,
+        Hora_int=pd.array(horas, dtype='Int64'),
+        DiaSemana=dias_semana[df_corridas['Data'].dt.dayofweek.to_numpy()],
+        Periodo=classificar_periodo(horas)
+    ))
+
+def compactar_corridas(df_corridas):
+    # Converte as colunas presentes para TIPOS_COMPACTOS (sem efeito nas que já estão)
+    return df_corridas.astype({
+        coluna: tipo for coluna, tipo in TIPOS_COMPACTOS.items() if coluna in df_corridas.columns
+    })
+
+def memoria_mb(df):
+    # Memória ocupada pelo DataFrame, contando o conteúdo dos textos
+    return df.memory_usage(deep=True).sum() / 2**20
+
+def ler_corridas_excel(caminho=ARQUIVO_CORRIDAS):
+    df_corridas = pd.read_excel(caminho, dtype=TIPOS_CORRIDAS)
+    return compactar_corridas(preprocessar_corridas(tipar_corridas(df_corridas)))
+
+def ler_linhas_novas(caminho, primeira_linha):
+    # Lê da planilha só as linhas a partir de `primeira_linha` (0 = primeira corrida, após o cabeçalho).
+    # O xlsx ainda é percorrido pelo openpyxl, mas só as linhas novas viram DataFrame e são tipadas.
+    import openpyxl
+    pasta = openpyxl.load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        planilha = pasta.worksheets[0]
+        cabecalho = next(planilha.iter_rows(max_row=1, values_only=True))
+        linhas = [
+            linha for linha in planilha.iter_rows(min_row=primeira_linha + 2, values_only=True)
+            if any(valor is not None for valor in linha)
+        ]
+    finally:
+        pasta.close()
+    df = pd.DataFrame(linhas, columns=list(cabecalho))
+    tipos = {coluna: tipo for coluna, tipo in TIPOS_CORRIDAS.items() if coluna in df.columns}
+    return tipar_corridas(df.astype(tipos))
+
+def ler_custos_excel(caminho=ARQUIVO_CUSTOS):
+    df_custos = pd.read_excel(caminho)
+    df_custos['Data'] = pd.to_datetime(df_custos['Data'], dayfirst=True)
+    return df_custos
+
+def tipar_ajustes(df_ajustes):
+    df_ajustes['Data'] = pd.to_datetime(df_ajustes['Data'], dayfirst=True)
+    if 'Hora' in df_ajustes.columns:
+        df_ajustes['Hora_seg'] = converter_hora(df_ajustes.pop('Hora'))
+    return df_ajustes
+
+def ler_ajustes_excel(caminho=ARQUIVO_AJUSTES):
+    return tipar_ajustes(pd.read_excel(caminho, dtype=TIPOS_AJUSTES))
+
+# =========================
+# Cache colunar (Parquet)
+# =========================
+
+def assinatura_arquivo(caminho):
+    # Caminho + mtime + tamanho: muda sempre que a planilha é salva novamente
+    info = os.stat(caminho)
+    return {
+        'caminho': os.path.abspath(caminho),
+        'mtime_ns': info.st_mtime_ns,
+        'tamanho': info.st_size,
+        'versao': VERSAO_ESQUEMA
+    }
+
+def caminho_cache(caminho):
+    pasta, arquivo = os.path.split(caminho)
+    nome = os.path.splitext(arquivo)[0]
+    return os.path.join(pasta, PASTA_CACHE, f'{nome}.parquet')
+
+def _ler_cache(destino):
+    # Retorna (DataFrame, metadados) do cache em disco, ou (None, {}) se não houver cache válido
+    try:
+        tabela = pq.read_table(destino, memory_map=True)
+    except (OSError, pa.ArrowException):
+        return None, {}
+    metadados = tabela.schema.metadata or {}
+    extras = json.loads(metadados.get(b'painel', b'{}'))
+    return tabela.to_pandas(), extras
+
+def _gravar_cache(df, destino, assinatura, **extras):
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    metadados = dict(tabela.schema.metadata or {})
+    metadados[b'painel'] = json.dumps(dict(extras, assinatura=assinatura), sort_keys=True).encode()
+    tabela = tabela.replace_schema_metadata(metadados)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    # Grava em arquivo temporário e troca de uma vez para nunca deixar um cache pela metade
+    temporario = f'{destino}.{os.getpid()}.tmp'
+    pq.write_table(tabela, temporario)
+    os.replace(temporario, destino)
+
+def ler_com_cache(caminho, leitor):
+    if pq is None:
+        return leitor(caminho)
+    assinatura = assinatura_arquivo(caminho)
+    destino = caminho_cache(caminho)
+    df, extras = _ler_cache(destino)
+    if df is None or extras.get('assinatura') != assinatura:
+        df = leitor(caminho)
+        _tentar_gravar_cache(df, destino, assinatura)
+    return df
+
+def _tentar_gravar_cache(df, destino, assinatura, **extras):
+    try:
+        _gravar_cache(df, destino, assinatura, **extras)
+    except OSError:
+        pass  # pasta somente leitura: segue sem cache em disco
+
+# =========================
+# Ingestão incremental de corridas
+# =========================
+
+def impressao_corrida(df_corridas, posicao):
+    # (Data, Hora, Valor, Link) de uma linha, em texto, para conferir se a planilha só ganhou linhas no fim
+    linha = df_corridas.iloc[posicao]
+    return [str(linha[coluna]) for coluna in COLUNAS_IMPRESSAO if coluna in df_corridas.columns]
+
+def atualizar_corridas(caminho=ARQUIVO_CORRIDAS, completo=False):
+    # Retorna (df_corridas, modo), com modo em 'cache', 'incremental' ou 'completo'.
+    # Se a planilha só recebeu corridas novas no final, apenas essas linhas são lidas,
+    # preprocessadas e acrescentadas ao Parquet. A emenda é conferida pela quantidade de linhas
+    # já ingeridas e pela impressão da última delas; se não bater, a leitura é completa.
+    # Edições em linhas antigas não são detectadas: use completo=True (ou --completo) nesses casos.
+    if pq is None:
+        return ler_corridas_excel(caminho), 'completo'
+
+    assinatura = assinatura_arquivo(caminho)
+    destino = caminho_cache(caminho)
+    df_salvo, extras = _ler_cache(destino)
+    salvo = extras.get('assinatura') or {}
+
+    if df_salvo is not None and salvo == assinatura and not completo:
+        return df_salvo, 'cache'
+
+    mesma_base = (
+        not completo and df_salvo is not None and TEM_OPENPYXL and len(df_salvo) > 0
+        and salvo.get('caminho') == assinatura['caminho']
+        and salvo.get('versao') == assinatura['versao']
+    )
+    if mesma_base:
+        linhas_salvas = extras['linhas']
+        # Relê a última linha já ingerida junto com as novas para confirmar a emenda
+        df_novas = compactar_corridas(ler_linhas_novas(caminho, linhas_salvas - 1))
+        if len(df_novas) > 0 and impressao_corrida(df_novas, 0) == extras.get('impressao'):
+            df_novas = preprocessar_corridas(df_novas.iloc[1:].reset_index(drop=True))
+            # Compacta de novo depois de juntar: um Tipo novo amplia as categorias
+            df_corridas = compactar_corridas(pd.concat([df_salvo, df_novas], ignore_index=True))
+            _tentar_gravar_cache(
+                df_corridas, destino, assinatura,
+                linhas=len(df_corridas), impressao=impressao_corrida(df_corridas, -1)
+            )
+            return df_corridas, 'incremental'
+
+    df_corridas = ler_corridas_excel(caminho)
+    if len(df_corridas) > 0:
+        _tentar_gravar_cache(
+            df_corridas, destino, assinatura,
+            linhas=len(df_corridas), impressao=impressao_corrida(df_corridas, -1)
+        )
+    return df_corridas, 'completo'
+
+def arquivos_bases(pasta=PASTA_BASE):
+    # (corridas, custos, ajustes) de uma pasta de motorista
+    return tuple(os.path.join(pasta, nome) for nome in (NOME_CORRIDAS, NOME_CUSTOS, NOME_AJUSTES))
+
+def pastas_motoristas(pasta):
+    # Subpastas com planilha de corridas (uma por motorista), em ordem alfabética
+    return sorted(
+        entrada.path for entrada in os.scandir(pasta)
+        if entrada.is_dir() and os.path.exists(os.path.join(entrada.path, NOME_CORRIDAS))
+    )
+
+def assinatura_bases(pasta=PASTA_BASE):
+    # Usada como chave do cache para recarregar só quando alguma planilha mudar
+    return tuple(
+        json.dumps(assinatura_arquivo(caminho) if os.path.exists(caminho) else None, sort_keys=True)
+        for caminho in arquivos_bases(pasta)
+    )
+
+# =========================
+# Ordenação e recorte por data
+# =========================
+
+def ordenar_por_data(df):
+    # O Parquet fica na ordem da planilha (necessário para a ingestão incremental);
+    # em memória as bases ficam ordenadas por Data para o recorte por busca binária
+    if df['Data'].is_monotonic_increasing:
+        return df
+    return df.sort_values('Data', kind='stable', ignore_index=True)
+
+def posicoes_periodo(df, data_inicio, data_fim):
+    # Posições [inicio, fim) das linhas de um DataFrame ordenado por Data dentro do período
+    datas = df['Data']
+    inicio = datas.searchsorted(pd.Timestamp(data_inicio), side='left')
+    fim = datas.searchsorted(pd.Timestamp(data_fim), side='right')
+    return int(inicio), int(fim)
+
+def fatiar_periodo(df, data_inicio, data_fim):
+    # Recorte [data_inicio, data_fim] de um DataFrame ordenado por Data: O(log n) e sem cópia
+    inicio, fim = posicoes_periodo(df, data_inicio, data_fim)
+    return df.iloc[inicio:fim]
+
+def base_vazia():
+    # Custos ou ajustes sem nenhum lançamento (planilha ou partições ausentes)
+    return pd.DataFrame({
+        'Data': pd.Series(dtype='datetime64[ns]'),
+        'Tipo': pd.Series(dtype='string'),
+        'Valor': pd.Series(dtype='float64')
+    })
+
+def _ler_opcional(caminho, leitor):
+    # Custos e ajustes são opcionais: sem a planilha, a base fica vazia
+    if not os.path.exists(caminho):
+        return base_vazia()
+    return ler_com_cache(caminho, leitor)
+
+def carregar_bases(pasta=PASTA_BASE):
+    arquivo_corridas, arquivo_custos, arquivo_ajustes = arquivos_bases(pasta)
+    df_corridas, _ = atualizar_corridas(arquivo_corridas)
+    df_custos = _ler_opcional(arquivo_custos, ler_custos_excel)
+    df_ajustes = _ler_opcional(arquivo_ajustes, ler_ajustes_excel)
+    return ordenar_por_data(df_corridas), ordenar_por_data(df_custos), ordenar_por_data(df_ajustes)
+
+
+if __name__ == '__main__':
+    # python -m painel.dados [--completo] -> ingere as corridas novas e mostra o que foi feito
+    import sys
+    df_corridas, modo = atualizar_corridas(completo='--completo' in sys.argv[1:])
+    print(f'{len(df_corridas)} corridas ({modo})')
@@ -0,0 +1,75 @@
+import numpy as np
+
+# =========================
+# Formatação para exibição
+# =========================
+# As tabelas ficam numéricas até a hora de mostrar; aqui cada coluna inteira é
+# formatada de uma vez com operações do NumPy, sem .apply célula a célula.
+
+COR_ALTA = "color: #54DD5B;"
+COR_BAIXA = "color: #EE595D;"
+
+def formatar_moeda(valor):
+    return f"R$ {valor:,.2f}".replace('.', 'X').replace(',', '.').replace('X', ',')
+
+def _separar_milhares(inteiros):
+    # 1234567 -> '1.234.567', um grupo de três dígitos por vez para a coluna toda
+    grupo = inteiros % 1000
+    texto = np.where(inteiros >= 1000, np.char.mod('%03d', grupo), np.char.mod('%d', grupo))
+    inteiros = inteiros // 1000
+    while (inteiros > 0).any():
+        grupo = inteiros % 1000
+        prefixo = np.where(inteiros >= 1000, np.char.mod('%03d', grupo), np.char.mod('%d', grupo))
+        texto = np.where(inteiros > 0, np.char.add(np.char.add(prefixo, '.'), texto), texto)
+        inteiros = inteiros // 1000
+    return texto
+
+def formatar_moedas(valores, vazio="-"):
+    # Mesmo resultado de formatar_moeda para cada valor; nulos viram `vazio`
+    valores = np.asarray(valores, dtype='float64')
+    if not valores.size:  # np.char.partition não aceita arrays vazios
+        return np.array([], dtype=object)
+    nulos = np.isnan(valores)
+    absolutos = np.where(nulos, 0.0, np.abs(valores))
+    # '%.2f' arredonda igual ao f-string; depois separa reais e centavos
+    texto = np.char.mod('%.2f', absolutos)
+    reais, _, centavos = np.char.partition(texto, '.').T
+    sinal = np.where(valores < 0, '-', '')
+    resultado = np.char.add(
+        np.char.add(np.char.add('R$ ', sinal), _separar_milhares(reais.astype('int64'))),
+        np.char.add(',', centavos)
+    )
+    return np.where(nulos, vazio, resultado).astype(object)
+
+def formatar_percentuais(valores, vazio="-"):
+    valores = np.asarray(valores, dtype='float64')
+    nulos = np.isnan(valores)
+    texto = np.char.mod('%.1f%%', np.where(nulos, 0.0, valores))
+    return np.where(nulos, vazio, texto).astype(object)
+
+def formatar_variacoes(valores, vazio="-"):
+    # ↑ para alta, ↓ para queda (em módulo), sem seta quando não variou
+    valores = np.asarray(valores, dtype='float64')
+    nulos = np.isnan(valores)
+    limpos = np.where(nulos, 0.0, valores)
+    texto = np.char.mod('%.1f%%', np.abs(limpos))
+    texto = np.select(
+        [limpos > 0, limpos < 0],
+        [np.char.add('↑ ', texto), np.char.add('↓ ', texto)],
+        default=np.char.mod('%.1f%%', limpos)
+    )
+    return np.where(nulos, vazio, texto).astype(object)
+
+def formatos_exibicao(tabela, formatadores):
+    # Formatadores para Styler.format: o texto de cada coluna é gerado de uma vez e a coluna
+    # continua numérica por baixo (ordenar pelo cabeçalho ordena pelos valores). Nulos ficam
+    # com o na_rep do Styler.
+    formatos = {}
+    for coluna, formatar in formatadores.items():
+        valores = tabela[coluna].dropna()
+        formatos[coluna] = dict(zip(valores, formatar(valores))).__getitem__
+    return formatos
+
+def cores_variacoes(valores):
+    valores = np.asarray(valores, dtype='float64')
+    return np.select([valores > 0, valores < 0], [COR_ALTA, COR_BAIXA], default="")
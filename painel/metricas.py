@@ -0,0 +1,222 @@
+import numpy as np
+import pandas as pd
+
+from painel.agregados import somar_por_periodo
+from painel.ajustes import COLUNAS_AJUSTES, taxa_cancelamento
+
+DIAS_ABREVIADOS = ['Seg', 'Ter', 'Qua', 'Qui', 'Sex', 'Sáb', 'Dom']
+
+# Acima deste número de corridas os gráficos de rentabilidade passam a ser montados
+# no servidor (histograma em faixas, quartis do boxplot e dispersão amostrada)
+LIMITE_CORRIDAS_GRAFICOS = 20_000
+MAX_OUTLIERS_BOXPLOT = 2_000
+MAX_PONTOS_DISPERSAO = 5_000
+
+# Métricas das tabelas MoM/WoW: rótulo no painel -> (coluna, nome na tabela)
+METRICAS_MOMWOW = {
+    "Faturamento Bruto": ("Valor", "Faturamento"),
+    "Faturamento por Dia": ("Faturamento_por_Dia", "Faturamento por Dia"),
+    "Faturamento por Corrida": ("Faturamento_por_Corrida", "Faturamento por Corrida"),
+    "Faturamento Ajustado": ("Faturamento_Ajustado", "Faturamento Ajustado"),
+    "Taxa de Cancelamento": ("Taxa_Cancelamento", "Taxa de Cancelamento")
+}
+# Métricas em % (com queda em verde: menos cancelamentos é melhor)
+METRICAS_PERCENTUAIS = {"Taxa_Cancelamento"}
+
+# Curva de Pareto: pontos distribuídos no eixo x e erro máximo (em pontos percentuais)
+PONTOS_PARETO = 300
+TOLERANCIA_PARETO = 0.5
+
+# =========================
+# Métricas das seções do painel
+# =========================
+# Funções puras (sem Streamlit), usadas pelo Dashboard e pelo benchmark
+
+def visao_geral(por_dia, df_corridas, df_custos, ajustes_dia, medianas=None):
+    # Indicadores da Visão Geral de um período. Totais e séries diárias saem do agregado diário;
+    # só as medianas por corrida precisam das corridas (ou vêm prontas em `medianas`,
+    # como (mediana do valor, mediana do KM), quando saem dos esboços de quantis)
+    corridas = int(por_dia['Corridas'].sum())
+    faturamento_bruto = float(por_dia['Valor'].sum())
+    # Ajustes de valor e cancelamentos (ajustes_cancelamentos.xlsx) entram no faturamento ajustado
+    faturamento_ajustado = faturamento_bruto + float(ajustes_dia['Ajustes'].sum())
+    cancelamentos = int(ajustes_dia['Cancelamentos'].sum())
+    custos = float(df_custos['Valor'].sum())
+    if medianas is None:
+        medianas = (
+            df_corridas['Valor'].astype('float64').median(),
+            df_corridas['KM'].astype('float64').median() if not df_corridas.empty else 0
+        )
+    mediana_valor, mediana_km_corrida = medianas
+    return {
+        'corridas': corridas,
+        'mediana_corridas_dia': float(por_dia['Corridas'].median()),
+        'km_total': float(por_dia['KM'].sum()),
+        'mediana_km_corrida': float(mediana_km_corrida),
+        'faturamento_bruto': faturamento_bruto,
+        'mediana_valor_dia': float(por_dia['Valor'].median()),
+        'mediana_valor': float(mediana_valor),
+        'duracao_min': float(por_dia['Duracao'].sum()),
+        'custos': custos,
+        'lucro_liquido': faturamento_bruto - custos,
+        'dias_corridos': len(por_dia),
+        'faturamento_ajustado': faturamento_ajustado,
+        'cancelamentos': cancelamentos,
+        'taxa_cancelamento': float(taxa_cancelamento(
+            cancelamentos, corridas, ajustes_dia['Cancelamentos_avulsos'].sum()
+        ))
+    }
+
+def metricas_por_periodo(por_dia, periodo_col, ajustes_dia=None):
+    # Faturamento, corridas e médias por mês ou semana (uma coluna por métrica de METRICAS_MOMWOW)
+    agrupado = somar_por_periodo(por_dia, periodo_col)
+    if ajustes_dia is not None:
+        # Junta os ajustes somados por período (poucas linhas, junção por hash)
+        agrupado = agrupado.merge(
+            somar_por_periodo(ajustes_dia, periodo_col, COLUNAS_AJUSTES),
+            on=periodo_col, how='outer', sort=True
+        ).fillna(0)
+        agrupado['Faturamento_Ajustado'] = agrupado['Valor'] + agrupado['Ajustes']
+        agrupado['Taxa_Cancelamento'] = taxa_cancelamento(
+            agrupado['Cancelamentos'], agrupado['Corridas'], agrupado['Cancelamentos_avulsos']
+        )
+    # As médias são ponderadas pela quantidade de corridas do dia, como na conta corrida a corrida
+    agrupado['Faturamento_por_Dia'] = agrupado['Valor_x_Corridas'] / agrupado['Corridas']
+    agrupado['Faturamento_por_Corrida'] = agrupado['Valor'] / agrupado['Corridas']
+    return agrupado
+
+def gerar_tabela_momwow(por_dia, periodo_col, col_metrica, nome_coluna, periodo_fmt, anterior_label, ajustes_dia=None):
+    agrupado = metricas_por_periodo(por_dia, periodo_col, ajustes_dia)
+    agrupado[f'Valor {anterior_label} anterior'] = agrupado[col_metrica].shift(1)
+    agrupado['Diferença (%)'] = ((agrupado[col_metrica] - agrupado[f'Valor {anterior_label} anterior']) / agrupado[f'Valor {anterior_label} anterior']) * 100
+    # Sem base de comparação (período anterior zerado, ex.: nenhum cancelamento) fica sem variação
+    agrupado['Diferença (%)'] = agrupado['Diferença (%)'].replace([np.inf, -np.inf], np.nan)
+    agrupado['Período'] = agrupado[periodo_col].dt.strftime(periodo_fmt)
+    tabela = agrupado[['Período', col_metrica, f'Valor {anterior_label} anterior', 'Diferença (%)']].copy()
+    tabela.rename(columns={
+        col_metrica: nome_coluna,
+        f'Valor {anterior_label} anterior': f"{nome_coluna} {anterior_label} anterior",
+        'Diferença (%)': 'Variação'
+    }, inplace=True)
+    return tabela
+
+def matriz_calor(cubo):
+    # Faturamento por hora (24 linhas) x dia da semana (colunas de Seg a Dom) com um
+    # único bincount sobre o código hora * 7 + dia; corridas sem hora ficam de fora
+    horas = cubo['Hora_int'].to_numpy('float64', na_value=np.nan)
+    validas = ~np.isnan(horas)
+    dias = cubo['Data'].dt.dayofweek.to_numpy()[validas]
+    codigos = horas[validas].astype('int64') * 7 + dias
+    valores = cubo['Valor'].to_numpy('float64')[validas]
+    matriz = np.bincount(codigos, weights=valores, minlength=24 * 7).reshape(24, 7)
+    return pd.DataFrame(matriz, index=pd.RangeIndex(24, name='Hora'), columns=DIAS_ABREVIADOS)
+
+def calcular_rentabilidade(df_corridas):
+    df_rent = df_corridas[(df_corridas['KM'] > 0) & (df_corridas['Duracao'] > 0)].copy()
+    df_rent['Rentabilidade_KM'] = df_rent['Valor'] / df_rent['KM']
+    df_rent['Rentabilidade_Tempo'] = df_rent['Valor'] / df_rent['Duracao']
+    return df_rent
+
+def resumo_dias_semana(df_corridas):
+    # Faturamento, média, mediana, desvio padrão e corridas por dia da semana (exato),
+    # em float64 e com os dias em ordem alfabética, como no resumo pelos esboços
+    resumo = df_corridas[['DiaSemana']].assign(Valor=df_corridas['Valor'].astype('float64')).groupby(
+        'DiaSemana', observed=True
+    ).agg(
+        Faturamento=('Valor', 'sum'),
+        Média_por_Corrida=('Valor', 'mean'),
+        Mediana_por_Corrida=('Valor', 'median'),
+        Desvio_Padrao=('Valor', 'std'),
+        Corridas=('Valor', 'count')
+    ).reset_index()
+    return resumo.astype({'DiaSemana': 'str'}).sort_values('DiaSemana', ignore_index=True)
+
+def histograma(valores, nbins=30):
+    # Contagens exatas por faixa; devolve (contagens, bordas) como o np.histogram
+    valores = np.asarray(valores, dtype='float64')
+    return np.histogram(valores[np.isfinite(valores)], bins=nbins)
+
+def resumo_boxplot(valores, max_outliers=MAX_OUTLIERS_BOXPLOT, semente=0):
+    # Quartis (método linear, o mesmo do Plotly) e limites de Tukey (1,5 x IQR) exatos;
+    # dos outliers vai só uma amostra de até `max_outliers`, sempre com os dois extremos
+    valores = np.asarray(valores, dtype='float64')
+    valores = valores[np.isfinite(valores)]
+    q1, mediana, q3 = np.percentile(valores, [25, 50, 75])
+    limite_inferior = q1 - 1.5 * (q3 - q1)
+    limite_superior = q3 + 1.5 * (q3 - q1)
+    dentro = valores[(valores >= limite_inferior) & (valores <= limite_superior)]
+    outliers = valores[(valores < limite_inferior) | (valores > limite_superior)]
+    total_outliers = len(outliers)
+    if total_outliers > max_outliers:
+        rng = np.random.default_rng(semente)
+        extremos = [outliers.min(), outliers.max()]
+        outliers = np.concatenate([extremos, rng.choice(outliers, max_outliers - 2, replace=False)])
+    return {
+        'q1': q1,
+        'mediana': mediana,
+        'q3': q3,
+        'cerca_inferior': dentro.min(),
+        'cerca_superior': dentro.max(),
+        'outliers': outliers,
+        'total_outliers': total_outliers
+    }
+
+def amostrar_dispersao(df, x, y, limite=MAX_PONTOS_DISPERSAO, celulas=50, semente=0):
+    # Amostra estratificada numa grade celulas x celulas do plano (x, y): cada célula
+    # fica com no máximo k pontos, com k o maior valor que cabe no limite. Regiões
+    # esparsas (e os pontos extremos) são mantidas inteiras, regiões densas são afinadas.
+    if len(df) <= limite:
+        return df
+    coordenadas = []
+    for coluna in (x, y):
+        valores = df[coluna].to_numpy('float64')
+        minimo, amplitude = np.nanmin(valores), np.nanmax(valores) - np.nanmin(valores)
+        posicao = (valores - minimo) / (amplitude or 1) * celulas
+        coordenadas.append(np.clip(np.nan_to_num(posicao), 0, celulas - 1).astype('int64'))
+    codigos = coordenadas[0] * celulas + coordenadas[1]
+
+    rng = np.random.default_rng(semente)
+    embaralhados = rng.permutation(len(df))
+    ordem = embaralhados[np.argsort(codigos[embaralhados], kind='stable')]
+    codigos_ordenados = codigos[ordem]
+    inicios = np.flatnonzero(np.r_[True, codigos_ordenados[1:] != codigos_ordenados[:-1]])
+    tamanhos = np.diff(np.r_[inicios, len(ordem)])
+    posicao_na_celula = np.arange(len(ordem)) - np.repeat(inicios, tamanhos)
+
+    # Maior k com sum(min(tamanho da célula, k)) <= limite, por busca binária
+    baixo, alto = 1, int(tamanhos.max())
+    while baixo < alto:
+        meio = (baixo + alto + 1) // 2
+        if np.minimum(tamanhos, meio).sum() <= limite:
+            baixo = meio
+        else:
+            alto = meio - 1
+    k = baixo
+    escolhidos = np.sort(ordem[posicao_na_celula < k])
+    return df.iloc[escolhidos]
+
+def curva_pareto(valores, total=None, pontos=PONTOS_PARETO, tolerancia=TOLERANCIA_PARETO):
+    # Acumulado (%) do faturamento com as corridas do maior para o menor valor.
+    # Retorna (curva, percent_corridas): a curva simplificada em poucas centenas de pontos
+    # e o percentual de corridas que soma até 80% do faturamento (corte via searchsorted).
+    # A curva é crescente, então guardar os pontos onde o acumulado cruza cada múltiplo de
+    # `tolerancia` (e o ponto anterior) limita o erro da linha a `tolerancia` pontos percentuais.
+    valores = np.asarray(valores, dtype='float64')
+    valores = valores[~np.isnan(valores)]
+    quantidade = len(valores)
+    if quantidade == 0:
+        return pd.DataFrame({'corrida_num': [], 'percentual': []}), 0.0
+    acumulado = np.cumsum(np.sort(valores)[::-1])
+    total = acumulado[-1] if total is None else total
+    percentual = 100 * acumulado / total
+
+    corte = int(np.searchsorted(percentual, 80, side='right'))
+    percent_corridas = 100 * corte / quantidade
+
+    niveis = np.searchsorted(percentual, np.arange(0, 100 + tolerancia, tolerancia), side='left')
+    indices = np.unique(np.clip(np.concatenate([
+        np.linspace(0, quantidade - 1, min(quantidade, pontos)).round().astype('int64'),
+        niveis, niveis - 1, [corte - 1, corte, quantidade - 1]
+    ]), 0, quantidade - 1))
+    curva = pd.DataFrame({'corrida_num': indices + 1, 'percentual': percentual[indices]})
+    return curva, percent_corridas
@@ -0,0 +1,172 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from painel.agregados import montar_cubo
+from painel.metricas import PONTOS_PARETO, TOLERANCIA_PARETO, curva_pareto, resumo_dias_semana
+
+
+# =========================
+# Motor SQL embutido (DuckDB) para as agregações sobre corridas
+# =========================
+# Com PAINEL_MOTOR=duckdb (e o pacote duckdb instalado), o cubo, as medianas da Visão Geral,
+# o resumo por dia da semana e a curva de Pareto são consultas SQL: execução vetorizada em
+# vários núcleos sobre as colunas do DataFrame já carregado (o DuckDB as lê no lugar). Só as
+# agregações ficam mais rápidas: as corridas continuam inteiras na memória, como sem o motor.
+# As tabelas MoM/WoW, o mapa de calor e os totais saem do cubo. Sem o motor, as mesmas funções
+# caem nas versões em pandas, com o mesmo retorno.
+
+MOTOR = os.environ.get('PAINEL_MOTOR', 'pandas')
+
+# O DuckDB só é importado quando o motor SQL foi pedido, para não pesar no início do painel
+duckdb = None
+if MOTOR == 'duckdb':
+    try:
+        import duckdb
+    except ImportError:  # sem DuckDB, todas as consultas seguem em pandas
+        duckdb = None
+
+_conexao = None
+
+
+def motor_sql():
+    return MOTOR == 'duckdb' and duckdb is not None
+
+def _consulta(df_corridas, colunas):
+    # Cursor próprio (uma sessão pode rodar em paralelo com outras) com as corridas como `corridas`.
+    # Só as colunas da consulta são registradas: as de texto que ela não usa nem são inspecionadas
+    global _conexao
+    if _conexao is None:
+        _conexao = duckdb.connect()
+    cursor = _conexao.cursor()
+    cursor.register('corridas_df', df_corridas[colunas])
+    # As colunas compactas (float32, inteiros pequenos, categorias) são lidas como DOUBLE,
+    # BIGINT e VARCHAR, para as somas não perderem precisão e os textos ordenarem como no pandas
+    selecao = ', '.join(_coluna_sql(coluna, df_corridas[coluna].dtype) for coluna in colunas)
+    cursor.execute(f'CREATE TEMP VIEW corridas AS SELECT {selecao} FROM corridas_df')
+    return cursor
+
+def _coluna_sql(coluna, tipo):
+    if isinstance(tipo, pd.CategoricalDtype) or pd.api.types.is_string_dtype(tipo):
+        tipo_sql = 'VARCHAR'
+    elif pd.api.types.is_float_dtype(tipo):
+        tipo_sql = 'DOUBLE'
+    elif pd.api.types.is_integer_dtype(tipo):
+        tipo_sql = 'BIGINT'
+    else:
+        return f'"{coluna}"'
+    return f'CAST("{coluna}" AS {tipo_sql}) AS "{coluna}"'
+
+def consultar_cubo(df_corridas):
+    # Mesmo retorno de agregados.montar_cubo
+    if not motor_sql():
+        return montar_cubo(df_corridas)
+    cubo = _consulta(df_corridas, ['Data', 'Hora_int', 'Valor', 'Duracao', 'KM']).execute('''
+        SELECT
+            Data,
+            Hora_int,
+            coalesce(sum(Valor), 0) AS Valor,
+            coalesce(sum(Valor * Valor), 0) AS Valor2,
+            count(*) AS Corridas,
+            coalesce(sum(Duracao), 0) AS Duracao,
+            coalesce(sum(KM), 0) AS KM
+        FROM corridas
+        GROUP BY Data, Hora_int
+        ORDER BY Data, Hora_int NULLS LAST
+    ''').df()
+    return cubo.astype({
+        'Data': df_corridas['Data'].dtype,
+        'Hora_int': df_corridas['Hora_int'].dtype,
+        'Corridas': 'int64',
+        'Duracao': 'int64'
+    })
+
+def consultar_medianas(df_corridas):
+    # (mediana do valor, mediana do KM) por corrida, como na Visão Geral
+    if not motor_sql():
+        return (
+            df_corridas['Valor'].astype('float64').median(),
+            df_corridas['KM'].astype('float64').median() if not df_corridas.empty else 0
+        )
+    mediana_valor, mediana_km = _consulta(df_corridas, ['Valor', 'KM']).execute(
+        'SELECT median(Valor), median(KM) FROM corridas'
+    ).fetchone()
+    return (
+        np.nan if mediana_valor is None else mediana_valor,
+        (np.nan if mediana_km is None else mediana_km) if not df_corridas.empty else 0
+    )
+
+def consultar_dias_semana(df_corridas):
+    # Mesmo retorno de metricas.resumo_dias_semana (mediana e desvio exatos)
+    if not motor_sql():
+        return resumo_dias_semana(df_corridas)
+    return _consulta(df_corridas, ['DiaSemana', 'Valor']).execute('''
+        SELECT
+            DiaSemana,
+            coalesce(sum(Valor), 0) AS Faturamento,
+            avg(Valor) AS "Média_por_Corrida",
+            median(Valor) AS Mediana_por_Corrida,
+            stddev_samp(Valor) AS Desvio_Padrao,
+            count(Valor) AS Corridas
+        FROM corridas
+        GROUP BY DiaSemana
+        ORDER BY DiaSemana
+    ''').df()
+
+def consultar_pareto(df_corridas, pontos=PONTOS_PARETO, tolerancia=TOLERANCIA_PARETO):
+    # Mesmo retorno de metricas.curva_pareto: o acumulado é uma janela sobre as corridas
+    # ordenadas no motor e só os pontos da curva simplificada voltam para o Python
+    # (os mesmos de curva_pareto: índices espaçados, cruzamentos de cada múltiplo de
+    # `tolerancia` com o ponto anterior e o corte dos 80%)
+    if not motor_sql():
+        return curva_pareto(df_corridas['Valor'].to_numpy())
+    consulta = _consulta(df_corridas, ['Valor'])
+    quantidade, = consulta.execute('SELECT count(Valor) FROM corridas').fetchone()
+    if quantidade == 0:
+        return pd.DataFrame({'corrida_num': [], 'percentual': []}), 0.0
+    espacados = np.linspace(0, quantidade - 1, min(quantidade, pontos)).round().astype('int64').tolist()
+    pontos_curva = consulta.execute('''
+        WITH acumuladas AS (
+            SELECT
+                row_number() OVER janela - 1 AS i,
+                sum(Valor) OVER janela AS acumulado
+            FROM corridas
+            WHERE Valor IS NOT NULL
+            WINDOW janela AS (ORDER BY Valor DESC ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW)
+        ), ordenadas AS (
+            -- O total é o último acumulado, como em curva_pareto (a última corrida fica em 100%)
+            SELECT i, 100 * acumulado / last_value(acumulado) OVER (
+                ORDER BY i ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING
+            ) AS percentual
+            FROM acumuladas
+        ), marcadas AS (
+            SELECT
+                i,
+                percentual,
+                floor(percentual / $tolerancia) AS nivel,
+                lag(floor(percentual / $tolerancia), 1, -1) OVER (ORDER BY i) AS nivel_anterior,
+                lead(floor(percentual / $tolerancia)) OVER (ORDER BY i) AS nivel_seguinte,
+                percentual <= 80 AS ate_80,
+                lag(percentual <= 80) OVER (ORDER BY i) AS ate_80_anterior,
+                lead(percentual <= 80) OVER (ORDER BY i) AS ate_80_seguinte
+            FROM ordenadas
+        )
+        SELECT i, percentual, ate_80
+        FROM marcadas
+        WHERE i = 0
+            OR nivel <> nivel_anterior
+            OR nivel <> nivel_seguinte
+            OR ate_80 <> ate_80_anterior
+            OR ate_80 <> ate_80_seguinte
+            OR list_contains($espacados, i)
+        ORDER BY i
+    ''', {'tolerancia': tolerancia, 'espacados': espacados}).df()
+
+    ate_80 = pontos_curva['i'][pontos_curva['ate_80']]
+    corte = int(ate_80.max()) + 1 if len(ate_80) else 0
+    curva = pd.DataFrame({
+        'corrida_num': pontos_curva['i'].to_numpy('int64') + 1,
+        'percentual': pontos_curva['percentual'].to_numpy('float64')
+    })
+    return curva, 100 * corte / quantidade
@@ -0,0 +1,217 @@
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+
+from painel import dados
+from painel.calendario import adicionar_mes_semana, inicio_mes
+from painel.custos import lucro_diario
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # sem pyarrow não há modo frota
+    pa = None
+    ds = None
+    pq = None
+
+# =========================
+# Frota: bases particionadas por motorista e mês
+# =========================
+# Layout (Parquet, partições no estilo hive):
+#   frota/corridas/motorista=<nome>/mes=AAAA-MM/parte-0.parquet
+#   frota/custos/motorista=<nome>/mes=AAAA-MM/parte-0.parquet
+#   frota/ajustes/motorista=<nome>/mes=AAAA-MM/parte-0.parquet
+# O motorista escolhe a pasta e o período escolhe os meses: só as partições do recorte são
+# lidas, então a memória de cada sessão depende do período, não do tamanho da frota.
+# Uso: python -m painel.particoes motoristas/ [--destino frota]
+
+# Com PAINEL_FROTA definido, o painel abre em modo frota (seletor de motorista na barra lateral)
+PASTA_FROTA = os.environ.get('PAINEL_FROTA')
+TABELAS = ['corridas', 'custos', 'ajustes']
+PADRAO_MOTORISTA = re.compile(r'^[\w.-]+$')
+
+
+def _pasta_motorista(raiz, tabela, motorista):
+    return os.path.join(raiz, tabela, f'motorista={motorista}')
+
+def _mes(data):
+    return pd.Timestamp(data).strftime('%Y-%m')
+
+# =========================
+# Gravação
+# =========================
+
+def _gravar_meses(df, destino):
+    # Uma partição por mês; as bases chegam ordenadas por Data, então cada mês é um recorte contíguo
+    meses = inicio_mes(df['Data'])
+    limites = np.flatnonzero(meses[1:] != meses[:-1]) + 1
+    for inicio, fim in zip(np.r_[0, limites], np.r_[limites, len(df)]):
+        pasta = os.path.join(destino, f'mes={_mes(meses[inicio])}')
+        os.makedirs(pasta, exist_ok=True)
+        tabela = pa.Table.from_pandas(df.iloc[inicio:fim], preserve_index=False)
+        pq.write_table(tabela, os.path.join(pasta, 'parte-0.parquet'))
+
+def exportar_motorista(pasta, raiz, motorista=None):
+    # Converte as planilhas de um motorista para o layout da frota, substituindo as partições anteriores
+    motorista = motorista or os.path.basename(os.path.normpath(pasta))
+    if not PADRAO_MOTORISTA.match(motorista):
+        raise ValueError(f'nome de motorista inválido para partição: {motorista!r}')
+    bases = dados.carregar_bases(pasta)
+    for tabela, df in zip(TABELAS, bases):
+        destino = _pasta_motorista(raiz, tabela, motorista)
+        # Grava ao lado e troca de uma vez, para uma sessão nunca ler um motorista pela metade
+        temporario = f'{destino}.{os.getpid()}.tmp'
+        shutil.rmtree(temporario, ignore_errors=True)
+        os.makedirs(temporario)
+        if not df.empty:
+            _gravar_meses(df, temporario)
+        antigo = f'{destino}.{os.getpid()}.antigo'
+        if os.path.exists(destino):
+            os.replace(destino, antigo)
+        os.replace(temporario, destino)
+        shutil.rmtree(antigo, ignore_errors=True)
+    return motorista, len(bases[0])
+
+# =========================
+# Leitura com filtros empurrados para as partições
+# =========================
+
+def listar_motoristas(raiz=PASTA_FROTA):
+    pasta = os.path.join(raiz, 'corridas')
+    if not os.path.isdir(pasta):
+        return []
+    return sorted(
+        nome.split('=', 1)[1] for nome in os.listdir(pasta)
+        if nome.startswith('motorista=') and not nome.endswith(('.tmp', '.antigo'))
+        and os.path.isdir(os.path.join(pasta, nome))
+    )
+
+def versao_motorista(raiz, motorista):
+    # Muda sempre que as partições do motorista são regravadas (chave do cache)
+    arquivos = []
+    for tabela in TABELAS:
+        for pasta, _, nomes in os.walk(_pasta_motorista(raiz, tabela, motorista)):
+            arquivos += [os.stat(os.path.join(pasta, nome)).st_mtime_ns for nome in nomes]
+    return json.dumps({'arquivos': len(arquivos), 'mtime_ns': max(arquivos, default=0)})
+
+def meses_motorista(raiz, motorista, tabela='corridas'):
+    pasta = _pasta_motorista(raiz, tabela, motorista)
+    if not os.path.isdir(pasta):
+        return []
+    return sorted(nome.split('=', 1)[1] for nome in os.listdir(pasta) if nome.startswith('mes='))
+
+def ler_tabela(raiz, tabela, motorista, data_inicio=None, data_fim=None, colunas=None):
+    # Lê só as partições do motorista e dos meses do período (sem data, sem limite daquele lado);
+    # dentro delas, o filtro por Data usa as estatísticas de cada arquivo Parquet
+    pasta = _pasta_motorista(raiz, tabela, motorista)
+    meses = meses_motorista(raiz, motorista, tabela)
+    if not meses:
+        return dados.base_vazia()
+    conjunto = ds.dataset(
+        pasta, format='parquet',
+        partitioning=ds.partitioning(pa.schema([('mes', pa.string())]), flavor='hive')
+    )
+    filtro = ds.scalar(True)
+    if data_inicio is not None:
+        inicio = pd.Timestamp(data_inicio)
+        filtro &= (ds.field('mes') >= _mes(inicio)) & (ds.field('Data') >= inicio)
+    if data_fim is not None:
+        fim = pd.Timestamp(data_fim)
+        filtro &= (ds.field('mes') <= _mes(fim)) & (ds.field('Data') < fim + pd.Timedelta(days=1))
+    tabela_lida = conjunto.to_table(columns=colunas, filter=filtro)
+    if 'mes' in tabela_lida.column_names:
+        tabela_lida = tabela_lida.drop_columns(['mes'])
+    return tabela_lida.to_pandas()
+
+def intervalo_datas(raiz, motorista):
+    # Primeira e última data de corrida lendo só a coluna Data do primeiro e do último mês
+    pasta = _pasta_motorista(raiz, 'corridas', motorista)
+    meses = meses_motorista(raiz, motorista)
+    primeiro, ultimo = (
+        pq.read_table(os.path.join(pasta, f'mes={mes}'), columns=['Data']).to_pandas()['Data']
+        for mes in (meses[0], meses[-1])
+    )
+    return primeiro.min(), ultimo.max()
+
+def custos_rateio(df_custos, data_inicio, data_fim):
+    # Lançamentos que definem o custo dos dias de [data_inicio, data_fim]: de cada Tipo, do último
+    # lançamento até o início do período ao primeiro depois do fim. Este só fecha o trecho anterior
+    # e entra com Valor zero: o trecho dele fica fora do período e seus KM não são lidos
+    inicio, fim = pd.Timestamp(data_inicio), pd.Timestamp(data_fim)
+    manter = pd.Series(False, index=df_custos.index)
+    fechamento = pd.Series(False, index=df_custos.index)
+    for _, datas in df_custos.groupby(df_custos['Tipo'].astype('string').fillna(''))['Data']:
+        anteriores = datas[datas <= inicio]
+        posteriores = datas[datas > fim]
+        desde = anteriores.max() if len(anteriores) else datas.min()
+        ate = posteriores.min() if len(posteriores) else None
+        manter[datas.index[(datas >= desde) & ((datas <= ate) if ate is not None else True)]] = True
+        if ate is not None:
+            fechamento[datas.index[datas == ate]] = True
+    return df_custos[manter].assign(Valor=df_custos['Valor'].where(~fechamento, 0.0)[manter])
+
+def janela_rateio(df_custos, data_inicio, data_fim):
+    # Período com os trechos de custo que tocam [data_inicio, data_fim]: desde o último lançamento
+    # de cada Tipo até o início do período até a véspera do próximo lançamento depois do fim
+    # (None: até o fim da base). O rateio por KM precisa dos KM do trecho inteiro.
+    inicio, fim = pd.Timestamp(data_inicio), pd.Timestamp(data_fim)
+    janela_inicio, janela_fim = inicio, fim
+    for _, datas in df_custos.groupby(df_custos['Tipo'].astype('string').fillna(''))['Data']:
+        anteriores = datas[datas <= inicio]
+        posteriores = datas[datas > fim]
+        if len(anteriores):
+            janela_inicio = min(janela_inicio, anteriores.max())
+        if not len(posteriores):
+            janela_fim = None
+        elif janela_fim is not None:
+            janela_fim = max(janela_fim, posteriores.min() - pd.Timedelta(days=1))
+    return janela_inicio, janela_fim
+
+def lucro_periodo(raiz, motorista, df_custos, data_inicio, data_fim):
+    # Lucro diário de [data_inicio, data_fim] igual ao da base inteira recortada, lendo só Data,
+    # Valor e KM da janela do rateio e só os lançamentos que pesam no período. (Um trecho sem
+    # nenhum KM antes da janela, que na base inteira passaria o custo adiante, fica de fora.)
+    custos = custos_rateio(df_custos, data_inicio, data_fim)
+    janela_inicio, janela_fim = janela_rateio(custos, data_inicio, data_fim)
+    corridas = ler_tabela(raiz, 'corridas', motorista, janela_inicio, janela_fim, colunas=['Data', 'Valor', 'KM'])
+    diario = adicionar_mes_semana(corridas.groupby('Data', sort=True)[['Valor', 'KM']].sum().reset_index())
+    lucro = lucro_diario(diario, custos)
+    return dados.fatiar_periodo(lucro, data_inicio, data_fim).reset_index(drop=True)
+
+def carregar_particoes(raiz, motorista, data_inicio, data_fim):
+    # Mesmo retorno de dados.carregar_bases, mas só com o período pedido. Os custos vêm
+    # inteiros (são poucos) porque o rateio por KM precisa do lançamento anterior ao período
+    return (
+        dados.ordenar_por_data(dados.compactar_corridas(ler_tabela(raiz, 'corridas', motorista, data_inicio, data_fim))),
+        dados.ordenar_por_data(ler_tabela(raiz, 'custos', motorista)),
+        dados.ordenar_por_data(ler_tabela(raiz, 'ajustes', motorista, data_inicio, data_fim))
+    )
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description='Converte as planilhas de cada motorista para o layout particionado da frota')
+    parser.add_argument('pasta', help='pasta com uma subpasta de planilhas por motorista')
+    parser.add_argument('--destino', default=PASTA_FROTA or 'frota', help='raiz do layout particionado')
+    args = parser.parse_args(argumentos)
+
+    falhas = 0
+    for pasta in dados.pastas_motoristas(args.pasta):
+        try:
+            motorista, linhas = exportar_motorista(pasta, args.destino)
+        except (OSError, ValueError) as erro:
+            falhas += 1
+            print(f'{os.path.basename(pasta):<30} erro: {erro}', file=sys.stderr, flush=True)
+        else:
+            print(f'{motorista:<30} {linhas:>10} corridas', flush=True)
+    return 1 if falhas else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
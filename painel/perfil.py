@@ -0,0 +1,108 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+# =========================
+# Perfil de desempenho por seção
+# =========================
+# Cada execução do Dashboard cria um Perfil e marca o início de cada seção com
+# perfil.secao(...). Ao final, o registro (tempo, linhas e acertos de cache por seção)
+# vai para o histórico da sessão e, se PAINEL_LOG_PERFIL estiver definido, é
+# acrescentado como uma linha JSON nesse arquivo para acompanhar a produção.
+
+ARQUIVO_LOG = os.environ.get('PAINEL_LOG_PERFIL')
+TAMANHO_HISTORICO = 50
+
+_local = threading.local()
+_trava_log = threading.Lock()
+
+
+def registrar_falha_cache(nome):
+    # Chamada pelo cache compartilhado (painel.cache) quando a função precisou ser calculada
+    falhas = getattr(_local, 'falhas', None)
+    if falhas is not None:
+        falhas.add(nome)
+
+
+class Perfil:
+    def __init__(self):
+        self.data = datetime.now().isoformat(timespec='seconds')
+        self.inicio = time.perf_counter()
+        self.secoes = []
+        self._atual = None
+        self.finalizado = False
+
+    def secao(self, nome, linhas=None):
+        # Fecha a seção anterior e começa a medir a próxima
+        self._fechar()
+        self._atual = {'secao': nome, 'linhas': linhas, 'cache': {}, 'inicio': time.perf_counter()}
+
+    def cache(self, nome, funcao, *args):
+        # Chama uma função com cache e anota se foi acerto (hit) ou falha (miss)
+        _local.falhas = set()
+        try:
+            resultado = funcao(*args)
+            falhou = nome in _local.falhas
+        finally:
+            _local.falhas = None
+        if self._atual is not None:
+            self._atual['cache'][nome] = 'miss' if falhou else 'hit'
+        return resultado
+
+    def _fechar(self):
+        if self._atual is None:
+            return
+        secao = self._atual
+        secao['ms'] = round((time.perf_counter() - secao.pop('inicio')) * 1000, 2)
+        self.secoes.append(secao)
+        self._atual = None
+
+    def finalizar(self):
+        self._fechar()
+        self.finalizado = True
+        registro = {
+            'data': self.data,
+            'total_ms': round((time.perf_counter() - self.inicio) * 1000, 2),
+            'secoes': self.secoes
+        }
+        if ARQUIVO_LOG:
+            with _trava_log, open(ARQUIVO_LOG, 'a', encoding='utf-8') as arquivo:
+                arquivo.write(json.dumps(registro, ensure_ascii=False) + '\n')
+        return registro
+
+
+def tabela_secoes(registro):
+    return pd.DataFrame([
+        {
+            'Seção': secao['secao'],
+            'ms': secao['ms'],
+            'Linhas': secao['linhas'],
+            'Cache': ', '.join(f'{nome}: {estado}' for nome, estado in secao['cache'].items())
+        }
+        for secao in registro['secoes']
+    ])
+
+
+def resumo_historico(historico):
+    # Tempo médio, p95 e máximo de cada seção nas últimas execuções da sessão
+    linhas = [
+        {'Seção': secao['secao'], 'ms': secao['ms']}
+        for registro in historico for secao in registro['secoes']
+    ]
+    if not linhas:
+        return pd.DataFrame(columns=['Seção', 'Execuções', 'Média (ms)', 'p95 (ms)', 'Máx (ms)'])
+    tempos = pd.DataFrame(linhas).groupby('Seção', sort=False)['ms']
+    return pd.DataFrame({
+        'Execuções': tempos.size(),
+        'Média (ms)': tempos.mean().round(1),
+        'p95 (ms)': tempos.quantile(0.95).round(1),
+        'Máx (ms)': tempos.max()
+    }).reset_index()
+
+
+def exportar_historico(historico):
+    return '\n'.join(json.dumps(registro, ensure_ascii=False) for registro in historico)
@@ -0,0 +1,61 @@
+import numpy as np
+
+# =========================
+# Esboço de quantis por dia
+# =========================
+# Histograma em baldes logarítmicos (no estilo do DDSketch): cada balde cobre valores
+# com a mesma ordem de grandeza relativa, então qualquer quantil sai com erro relativo
+# de no máximo ALFA. Os esboços de dias diferentes se juntam somando as contagens; por
+# isso guardamos a soma acumulada por dia e qualquer período vira uma subtração.
+
+ALFA = 0.01
+GAMA = (1 + ALFA) / (1 - ALFA)
+MENOR_VALOR = 0.01    # valores abaixo disso (inclusive zero e negativos) caem no balde 0
+MAIOR_VALOR = 100_000
+
+# Até esta quantidade de corridas no período as medianas são calculadas de forma exata
+LIMITE_MEDIANAS_EXATAS = 100_000
+_LOG_GAMA = np.log(GAMA)
+_PRIMEIRO = int(np.ceil(np.log(MENOR_VALOR) / _LOG_GAMA))
+N_BALDES = int(np.ceil(np.log(MAIOR_VALOR) / _LOG_GAMA)) - _PRIMEIRO + 2
+
+# Valor representativo de cada balde (o ponto de erro relativo mínimo do intervalo)
+VALORES_BALDES = np.concatenate([
+    [0.0],
+    2 * GAMA ** np.arange(_PRIMEIRO, _PRIMEIRO + N_BALDES - 1) / (GAMA + 1)
+])
+
+
+def baldes(valores):
+    valores = np.asarray(valores, dtype='float64')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        indices = np.ceil(np.log(valores) / _LOG_GAMA) - _PRIMEIRO + 1
+    indices = np.where(valores >= MENOR_VALOR, indices, 0)
+    return np.clip(np.nan_to_num(indices), 0, N_BALDES - 1).astype('int64')
+
+
+def montar_esboco(datas_corridas, valores, dias):
+    # Soma acumulada, por dia de `dias` (ordenado), das contagens por balde:
+    # linha i = corridas dos dias anteriores a dias[i]. Valores nulos são ignorados.
+    valores = np.asarray(valores, dtype='float64')
+    validos = ~np.isnan(valores)
+    posicao_dia = np.searchsorted(np.asarray(dias), np.asarray(datas_corridas)[validos])
+    codigos = posicao_dia * N_BALDES + baldes(valores[validos])
+    contagens = np.bincount(codigos, minlength=len(dias) * N_BALDES).reshape(len(dias), N_BALDES)
+    acumulado = np.zeros((len(dias) + 1, N_BALDES), dtype='int32')
+    np.cumsum(contagens, axis=0, out=acumulado[1:])
+    return acumulado
+
+
+def contagens_periodo(acumulado, inicio, fim):
+    # Esboço dos dias [inicio, fim) (posições no agregado diário): custo O(N_BALDES)
+    return acumulado[fim] - acumulado[inicio]
+
+
+def quantil(contagens, q):
+    # Quantil aproximado (erro relativo <= ALFA) a partir das contagens por balde
+    total = contagens.sum()
+    if total == 0:
+        return np.nan
+    posicao = np.searchsorted(np.cumsum(contagens), q * (total - 1), side='right')
+    return VALORES_BALDES[min(posicao, N_BALDES - 1)]
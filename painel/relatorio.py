@@ -0,0 +1,229 @@
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from painel import dados
+from painel.agregados import agregar_por_dia
+from painel.ajustes import ajustes_por_dia
+from painel.formatacao import formatar_moedas, formatar_percentuais, formatar_variacoes
+from painel.metricas import METRICAS_MOMWOW, METRICAS_PERCENTUAIS, gerar_tabela_momwow, visao_geral
+from painel.motor import consultar_cubo, consultar_dias_semana, consultar_medianas
+
+# =========================
+# Relatórios em lote (sem Streamlit)
+# =========================
+# Uso: python -m painel.relatorio motoristas/ --saida relatorios/ [--formatos json html parquet]
+#      [--processos 8] [--inicio 2025-01-01] [--fim 2025-03-31]
+# Cada subpasta de `motoristas/` é um motorista, com as mesmas planilhas de basedados/
+# (corridas_uber.xlsx obrigatória; gasolina.xlsx e ajustes_cancelamentos.xlsx opcionais).
+# Os motoristas são processados em paralelo, por padrão um processo por núcleo, e cada um
+# gera um arquivo por formato em `saida/`.
+
+FORMATOS = ['json', 'html', 'parquet']
+CASAS_DECIMAIS = 2
+
+# Indicador da Visão Geral -> (rótulo, tipo de formatação no HTML)
+ROTULOS_VISAO_GERAL = {
+    'corridas': ('Corridas', 'inteiro'),
+    'mediana_corridas_dia': ('Corridas por Dia (Mediana)', 'decimal'),
+    'km_total': ('KM Rodados', 'decimal'),
+    'mediana_km_corrida': ('KM por Corrida (Mediana)', 'decimal'),
+    'faturamento_bruto': ('Faturamento Bruto', 'moeda'),
+    'mediana_valor_dia': ('Faturamento por Dia (Mediana)', 'moeda'),
+    'mediana_valor': ('Faturamento por Corrida (Mediana)', 'moeda'),
+    'duracao_min': ('Duração (min)', 'inteiro'),
+    'custos': ('Custos Operacionais', 'moeda'),
+    'lucro_liquido': ('Lucro Líquido', 'moeda'),
+    'dias_corridos': ('Dias Corridos', 'inteiro'),
+    'faturamento_ajustado': ('Faturamento Ajustado', 'moeda'),
+    'cancelamentos': ('Cancelamentos', 'inteiro'),
+    'taxa_cancelamento': ('Taxa de Cancelamento', 'percentual')
+}
+
+
+def calcular_relatorio(pasta, data_inicio=None, data_fim=None):
+    # Mesmos números do painel (Visão Geral, MoM/WoW de cada métrica e Revisão Semanal)
+    # para a pasta de um motorista; sem datas, vale a base inteira
+    df_corridas, df_custos, df_ajustes = dados.carregar_bases(pasta)
+    if df_corridas.empty:
+        raise ValueError(f'{pasta}: nenhuma corrida em {dados.NOME_CORRIDAS}')
+    por_dia = agregar_por_dia(consultar_cubo(df_corridas))
+    ajustes_dia = ajustes_por_dia(df_corridas, df_ajustes)
+
+    data_inicio = pd.Timestamp(data_inicio) if data_inicio else df_corridas['Data'].iloc[0]
+    data_fim = pd.Timestamp(data_fim) if data_fim else df_corridas['Data'].iloc[-1]
+    filtro_corridas, filtro_custos, filtro_dia, filtro_ajustes = (
+        dados.fatiar_periodo(df, data_inicio, data_fim) for df in (df_corridas, df_custos, por_dia, ajustes_dia)
+    )
+    # Centavos e KM com 2 casas: sem isso, o ruído dos float32 das bases vai para os arquivos
+    indicadores = visao_geral(
+        filtro_dia, filtro_corridas, filtro_custos, filtro_ajustes, consultar_medianas(filtro_corridas)
+    )
+    return {
+        'motorista': os.path.basename(os.path.normpath(pasta)),
+        'periodo': {'inicio': data_inicio.strftime('%Y-%m-%d'), 'fim': data_fim.strftime('%Y-%m-%d')},
+        'visao_geral': {
+            chave: round(valor, CASAS_DECIMAIS) if isinstance(valor, float) else valor
+            for chave, valor in indicadores.items()
+        },
+        'mom': {
+            nome: gerar_tabela_momwow(filtro_dia, 'Mes', coluna, nome, '%b/%y', 'mês', filtro_ajustes).round(CASAS_DECIMAIS)
+            for coluna, nome in METRICAS_MOMWOW.values()
+        },
+        'wow': {
+            nome: gerar_tabela_momwow(
+                filtro_dia, 'Semana', coluna, nome, '%d/%m/%y', 'semana', filtro_ajustes
+            ).round(CASAS_DECIMAIS)
+            for coluna, nome in METRICAS_MOMWOW.values()
+        },
+        'dias_semana': consultar_dias_semana(filtro_corridas).round(CASAS_DECIMAIS)
+    }
+
+
+# =========================
+# Gravação (JSON, HTML e Parquet)
+# =========================
+
+def _registros(tabela):
+    # DataFrame -> lista de dicionários, com NaN virando null
+    return json.loads(tabela.to_json(orient='records', force_ascii=False))
+
+def _finito(valor):
+    # NaN e infinito (ex.: mediana de um período sem corridas) viram null: não existem em JSON
+    return valor if not isinstance(valor, float) or math.isfinite(valor) else None
+
+def gravar_json(relatorio, destino):
+    conteudo = dict(relatorio)
+    conteudo['visao_geral'] = {chave: _finito(valor) for chave, valor in relatorio['visao_geral'].items()}
+    conteudo['mom'] = {nome: _registros(tabela) for nome, tabela in relatorio['mom'].items()}
+    conteudo['wow'] = {nome: _registros(tabela) for nome, tabela in relatorio['wow'].items()}
+    conteudo['dias_semana'] = _registros(relatorio['dias_semana'])
+    with open(destino, 'w', encoding='utf-8') as arquivo:
+        json.dump(conteudo, arquivo, ensure_ascii=False, indent=2, allow_nan=False)
+
+def _formatar_indicador(valor, tipo):
+    if tipo == 'moeda':
+        return formatar_moedas([valor])[0]
+    if tipo == 'percentual':
+        return formatar_percentuais([valor])[0]
+    if tipo == 'inteiro':
+        return f'{valor:.0f}'
+    return f'{valor:.2f}'
+
+def _formatar_momwow(tabela, percentual):
+    formatar = formatar_percentuais if percentual else formatar_moedas
+    exibicao = tabela.assign(**{coluna: formatar(tabela[coluna]) for coluna in tabela.columns[1:3]})
+    exibicao['Variação'] = formatar_variacoes(tabela['Variação'])
+    return exibicao
+
+def gravar_html(relatorio, destino):
+    colunas_metricas = {nome: coluna for coluna, nome in METRICAS_MOMWOW.values()}
+    visao = pd.DataFrame([
+        {'Indicador': rotulo, 'Valor': _formatar_indicador(relatorio['visao_geral'][chave], tipo)}
+        for chave, (rotulo, tipo) in ROTULOS_VISAO_GERAL.items()
+    ])
+    dias = relatorio['dias_semana']
+    dias = dias.assign(**{
+        coluna: formatar_moedas(dias[coluna])
+        for coluna in ['Faturamento', 'Média_por_Corrida', 'Mediana_por_Corrida', 'Desvio_Padrao']
+    })
+    partes = [
+        f"<h1>Painel de Desempenho: {relatorio['motorista']}</h1>",
+        f"<p>Período analisado: {relatorio['periodo']['inicio']} a {relatorio['periodo']['fim']}</p>",
+        '<h2>Visão Geral</h2>', visao.to_html(index=False)
+    ]
+    for chave, titulo in (('mom', 'Comparativo por Mês (MoM)'), ('wow', 'Comparativo por Semana (WoW)')):
+        for nome, tabela in relatorio[chave].items():
+            percentual = colunas_metricas[nome] in METRICAS_PERCENTUAIS
+            partes += [f'<h2>{titulo} - {nome}</h2>', _formatar_momwow(tabela, percentual).to_html(index=False)]
+    partes += ['<h2>Revisão Semanal</h2>', dias.to_html(index=False)]
+    with open(destino, 'w', encoding='utf-8') as arquivo:
+        arquivo.write('<!DOCTYPE html>\n<html><head><meta charset="utf-8"></head><body>\n')
+        arquivo.write('\n'.join(partes))
+        arquivo.write('\n</body></html>\n')
+
+def tabela_longa(relatorio):
+    # Todas as tabelas do relatório em formato longo (Tabela, Metrica, Chave, Coluna, Valor),
+    # para juntar os Parquet de vários motoristas numa consulta só
+    linhas = [
+        ('visao_geral', chave, '', '', float(valor)) for chave, valor in relatorio['visao_geral'].items()
+    ]
+    for chave in ('mom', 'wow'):
+        for nome, tabela in relatorio[chave].items():
+            for coluna, rotulo in zip(tabela.columns[1:], ['atual', 'anterior', 'variacao']):
+                linhas += [
+                    (chave, nome, periodo, rotulo, valor)
+                    for periodo, valor in zip(tabela['Período'], tabela[coluna].astype('float64'))
+                ]
+    dias = relatorio['dias_semana']
+    for coluna in dias.columns[1:]:
+        linhas += [
+            ('dias_semana', coluna, dia, '', valor)
+            for dia, valor in zip(dias['DiaSemana'], dias[coluna].astype('float64'))
+        ]
+    longa = pd.DataFrame(linhas, columns=['Tabela', 'Metrica', 'Chave', 'Coluna', 'Valor'])
+    longa.insert(0, 'Motorista', relatorio['motorista'])
+    return longa
+
+def gravar_parquet(relatorio, destino):
+    tabela_longa(relatorio).to_parquet(destino, index=False)
+
+GRAVADORES = {'json': gravar_json, 'html': gravar_html, 'parquet': gravar_parquet}
+
+
+def processar_motorista(pasta, saida, formatos, data_inicio=None, data_fim=None):
+    # Executado em um processo do pool: calcula e grava os relatórios de um motorista
+    inicio = time.perf_counter()
+    relatorio = calcular_relatorio(pasta, data_inicio, data_fim)
+    arquivos = []
+    for formato in formatos:
+        destino = os.path.join(saida, f"{relatorio['motorista']}.{formato}")
+        GRAVADORES[formato](relatorio, destino)
+        arquivos.append(destino)
+    return relatorio['motorista'], time.perf_counter() - inicio, arquivos
+
+
+def executar(pasta, saida, formatos=FORMATOS, processos=None, data_inicio=None, data_fim=None):
+    # Retorna a lista de (pasta, erro) dos motoristas que falharam
+    motoristas = dados.pastas_motoristas(pasta)
+    os.makedirs(saida, exist_ok=True)
+    falhas = []
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        tarefas = {
+            executor.submit(processar_motorista, motorista, saida, formatos, data_inicio, data_fim): motorista
+            for motorista in motoristas
+        }
+        for tarefa in as_completed(tarefas):
+            try:
+                nome, segundos, _ = tarefa.result()
+            except Exception as erro:  # um motorista com planilha ruim não derruba os outros
+                falhas.append((tarefas[tarefa], erro))
+                print(f'{os.path.basename(tarefas[tarefa]):<30} erro: {erro}', file=sys.stderr, flush=True)
+            else:
+                print(f'{nome:<30} {segundos * 1000:>10.1f} ms', flush=True)
+    print(f'{len(motoristas) - len(falhas)} de {len(motoristas)} motoristas em {saida}')
+    return falhas
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description='Relatórios do Painel Uber para vários motoristas, em paralelo')
+    parser.add_argument('pasta', help='pasta com uma subpasta de planilhas por motorista')
+    parser.add_argument('--saida', default='relatorios', help='pasta onde os relatórios são gravados')
+    parser.add_argument('--formatos', nargs='+', choices=FORMATOS, default=FORMATOS)
+    parser.add_argument('--processos', type=int, help='processos em paralelo (padrão: um por núcleo)')
+    parser.add_argument('--inicio', help='data inicial (AAAA-MM-DD); padrão: primeira corrida')
+    parser.add_argument('--fim', help='data final (AAAA-MM-DD); padrão: última corrida')
+    args = parser.parse_args(argumentos)
+
+    falhas = executar(args.pasta, args.saida, args.formatos, args.processos, args.inicio, args.fim)
+    return 1 if falhas else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,60 @@
+import numpy as np
+
+from painel.dados import classificar_periodo
+
+# =========================
+# Simulação de Monte Carlo da meta de faturamento
+# =========================
+# Cada caminho sorteia, com reposição, `dias` dias do histórico filtrado (bootstrap). O dia
+# inteiro é sorteado, com o faturamento de cada turno, para manter a relação entre os turnos
+# de um mesmo dia. Os caminhos são processados em lotes de matrizes NumPy, sem laço por caminho.
+
+TURNOS = ['Manhã', 'Tarde', 'Noite']
+CAMINHOS_PADRAO = 10_000
+PERCENTIS_BANDAS = [5, 25, 50, 75, 95]
+PONTOS_BANDAS = 60  # dias marcados no gráfico de faixas
+ELEMENTOS_POR_LOTE = 2_000_000  # caminhos x dias sorteados em memória por vez
+
+def faturamento_dia_turno(cubo):
+    # Matriz (dias trabalhados x turnos) com o faturamento de cada turno em cada dia do cubo
+    _, dia = np.unique(cubo['Data'].to_numpy(), return_inverse=True)
+    periodos = classificar_periodo(cubo['Hora_int'].to_numpy('float64', na_value=np.nan))
+    turno = np.select([periodos == 'Manhã', periodos == 'Tarde'], [0, 1], default=2)
+    n_dias = dia.max() + 1 if len(dia) else 0
+    return np.bincount(
+        dia * len(TURNOS) + turno, weights=cubo['Valor'].to_numpy('float64'), minlength=n_dias * len(TURNOS)
+    ).reshape(n_dias, len(TURNOS))
+
+def simular_meta(historico, meta_valor, dias, caminhos=CAMINHOS_PADRAO, semente=0):
+    # Probabilidade de atingir `meta_valor` em `dias` dias, faixas do faturamento acumulado
+    # nos dias marcados e faturamento médio por turno nos caminhos que atingem a meta
+    rng = np.random.default_rng(semente)
+    dias = int(dias)
+    marcados = np.unique(np.linspace(1, dias, min(dias, PONTOS_BANDAS)).round().astype('int64'))
+    acumulados = np.empty((caminhos, len(marcados)), dtype='float32')
+    dia_meta = np.full(caminhos, -1, dtype='int64')
+
+    faturamento_dia = historico.sum(axis=1)
+    vezes_sorteado = np.zeros(len(historico), dtype='int64')  # por dia do histórico, nos caminhos de sucesso
+    lote = max(1, ELEMENTOS_POR_LOTE // dias)
+    for inicio in range(0, caminhos, lote):
+        fim = min(inicio + lote, caminhos)
+        sorteados = rng.integers(0, len(historico), size=(fim - inicio, dias), dtype='int32')
+        acumulado = faturamento_dia[sorteados].cumsum(axis=1)
+        acumulados[inicio:fim] = acumulado[:, marcados - 1]
+        atingiu = acumulado[:, -1] >= meta_valor
+        # Primeiro dia em que o acumulado passa da meta (o faturamento nunca é negativo)
+        dia_meta[inicio:fim][atingiu] = (acumulado[atingiu] >= meta_valor).argmax(axis=1) + 1
+        vezes_sorteado += np.bincount(sorteados[atingiu].ravel(), minlength=len(historico))
+    turnos_sucesso = vezes_sorteado @ historico
+
+    sucessos = dia_meta > 0
+    n_sucessos = int(sucessos.sum())
+    return {
+        'caminhos': caminhos,
+        'probabilidade': n_sucessos / caminhos,
+        'dias_marcados': marcados,
+        'bandas': dict(zip(PERCENTIS_BANDAS, np.percentile(acumulados, PERCENTIS_BANDAS, axis=0))),
+        'dia_meta_mediano': float(np.median(dia_meta[sucessos])) if n_sucessos else None,
+        'turnos_sucesso': turnos_sucesso / (n_sucessos * dias) if n_sucessos else None
+    }
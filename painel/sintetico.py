@@ -0,0 +1,77 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# =========================
+# Bases sintéticas
+# =========================
+# Geram DataFrames com as mesmas colunas das planilhas de basedados/, no formato
+# em que o pd.read_excel as entrega (Hora como datetime.time), para testes de carga.
+
+CORRIDAS_POR_DIA = 12
+ANOS_PADRAO = 3  # bases grandes ficam com mais corridas por dia, não com mais anos
+TIPOS_CORRIDA = ['UberX', 'Comfort', 'Black']
+LIMITE_LINHAS_EXCEL = 1_048_575  # linhas de dados em uma planilha do Excel
+
+def gerar_corridas(linhas, inicio='2020-01-01', semente=0, anos=ANOS_PADRAO):
+    # CORRIDAS_POR_DIA até completar `anos` anos de base; depois disso, mais corridas por dia
+    rng = np.random.default_rng(semente)
+    dias = max(1, min(int(np.ceil(linhas / CORRIDAS_POR_DIA)), int(anos * 365)))
+    datas = pd.Timestamp(inicio) + pd.to_timedelta(np.sort(rng.integers(0, dias, linhas)), unit='D')
+
+    # Horários concentrados à tarde e à noite, como na base real
+    horas = np.clip(rng.normal(17.5, 4.0, linhas), 0, 23.99)
+    segundos = (horas * 3600).astype('int64') // 60 * 60
+    km = np.round(rng.gamma(2.0, 2.0, linhas) + 0.3, 2)
+    duracao = np.maximum(1, np.round(km * rng.uniform(2.0, 5.0, linhas))).astype('int64')
+    valor = np.round(4.0 + km * rng.uniform(1.5, 3.0, linhas) + duracao * 0.3, 4)
+    ids = rng.integers(0, 2**62, linhas)
+
+    return pd.DataFrame({
+        'Tipo': rng.choice(TIPOS_CORRIDA, linhas, p=[0.6, 0.3, 0.1]),
+        'Data': datas,
+        'Hora': pd.to_datetime(segundos, unit='s').time,
+        'KM': km,
+        'Duracao': duracao,
+        'Valor': valor,
+        'Link': np.char.add('https://riders.uber.com/trips/', np.char.mod('%016x', ids))
+    })
+
+def gerar_custos(df_corridas, a_cada_dias=5, semente=0):
+    # Um abastecimento a cada `a_cada_dias` dias e uma manutenção por mês
+    rng = np.random.default_rng(semente)
+    inicio, fim = df_corridas['Data'].min(), df_corridas['Data'].max()
+    abastecimentos = pd.date_range(inicio, fim, freq=f'{a_cada_dias}D')
+    manutencoes = pd.date_range(inicio, fim, freq='MS')
+    df_custos = pd.DataFrame({
+        'Data': abastecimentos.append(manutencoes),
+        'Tipo': ['Combustível'] * len(abastecimentos) + ['Manutenção'] * len(manutencoes),
+        'Valor': np.concatenate([
+            rng.integers(150, 300, len(abastecimentos)),
+            rng.integers(100, 600, len(manutencoes))
+        ])
+    })
+    return df_custos.sort_values('Data', ignore_index=True)
+
+def gerar_ajustes(df_corridas, fracao=0.01, semente=0):
+    # Uma fração das corridas com ajuste de valor ou cancelamento, com Data, Hora e Link da corrida
+    rng = np.random.default_rng(semente)
+    escolhidas = df_corridas.sample(frac=fracao, random_state=semente)
+    cancelada = rng.random(len(escolhidas)) < 0.5
+    return pd.DataFrame({
+        'Data': escolhidas['Data'].to_numpy(),
+        'Hora': escolhidas['Hora'].to_numpy(),
+        'Tipo': np.where(cancelada, 'Cancelamento', 'Ajuste'),
+        'Valor': np.round(np.where(cancelada, rng.uniform(0, 10, len(escolhidas)), rng.normal(0, 3, len(escolhidas))), 2),
+        'Link': escolhidas['Link'].to_numpy()
+    }).sort_values('Data', ignore_index=True)
+
+def salvar_excel(pasta, df_corridas, df_custos, df_ajustes):
+    # Grava as três planilhas com os mesmos nomes de basedados/
+    if len(df_corridas) > LIMITE_LINHAS_EXCEL:
+        raise ValueError(f'O Excel comporta no máximo {LIMITE_LINHAS_EXCEL} corridas por planilha')
+    os.makedirs(pasta, exist_ok=True)
+    df_corridas.to_excel(os.path.join(pasta, 'corridas_uber.xlsx'), index=False)
+    df_custos.to_excel(os.path.join(pasta, 'gasolina.xlsx'), index=False)
+    df_ajustes.to_excel(os.path.join(pasta, 'ajustes_cancelamentos.xlsx'), index=False)
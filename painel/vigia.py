@@ -0,0 +1,91 @@
+import os
+import sys
+import threading
+import time
+
+from painel import dados
+from painel.cache import CACHE, somente_leitura
+from painel.perfil import registrar_falha_cache
+
+# =========================
+# Vigia das planilhas (segundo plano)
+# =========================
+# Uma thread por processo do servidor confere a assinatura das planilhas de basedados/ a cada
+# PAINEL_VIGIA_SEGUNDOS. Quando alguma muda, ela mesma remonta as bases e os agregados (função
+# `preparar`, fora de qualquer sessão) e só então troca o retrato atual, de uma vez. As sessões
+# leem sempre o último retrato pronto: nenhuma espera a ingestão, exceto a primeira depois de o
+# servidor subir (rode python -m painel.aquecimento antes para ela ler só o Parquet).
+# As bases e os agregados da versão no ar ficam fixos no cache compartilhado até a próxima
+# troca, então os resultados por período calculados nas sessões nunca releem as planilhas.
+
+INTERVALO_SEGUNDOS = float(os.environ.get('PAINEL_VIGIA_SEGUNDOS', 5))
+
+_vigias = {}
+_trava = threading.Lock()
+
+
+class Vigia:
+    def __init__(self, pasta, preparar, intervalo=INTERVALO_SEGUNDOS, cache=CACHE):
+        self.pasta = pasta
+        self.preparar = preparar
+        self.intervalo = intervalo
+        self.cache = cache
+        self._retrato = None  # (assinatura, resultado de preparar), trocado numa única atribuição
+        self._pronto = threading.Event()
+        self._falhou = None  # assinatura cuja montagem falhou: só tenta de novo quando a planilha mudar
+        self._erro = None
+        self._thread = threading.Thread(target=self._vigiar, name=f'vigia {pasta}', daemon=True)
+
+    def iniciar(self):
+        self._thread.start()
+        return self
+
+    def verificar(self):
+        # Uma rodada da vigia: monta a versão atual das planilhas se ela ainda não estiver pronta.
+        # Se a montagem falhar (ex.: planilha salva pela metade), o retrato anterior continua valendo
+        assinatura = dados.assinatura_bases(self.pasta)
+        atual = self._retrato
+        if (atual is not None and atual[0] == assinatura) or assinatura == self._falhou:
+            return False
+        # Durante a montagem, a versão no ar e a nova ficam fixas; depois, só a que ficar no ar
+        no_ar = set() if atual is None else {atual[0]}
+        self.cache.fixar_versoes(no_ar | {assinatura})
+        try:
+            resultado = self.preparar(assinatura)
+        except Exception as erro:
+            self.cache.fixar_versoes(no_ar)
+            self._falhou, self._erro = assinatura, erro
+            print(f'vigia {self.pasta}: erro ao montar as bases: {erro}', file=sys.stderr, flush=True)
+            self._pronto.set()
+            return False
+        self._retrato = (assinatura, resultado)
+        self.cache.fixar_versoes({assinatura})
+        self._falhou = self._erro = None
+        self._pronto.set()
+        return True
+
+    def _vigiar(self):
+        while True:
+            self.verificar()
+            time.sleep(self.intervalo)
+
+    def retrato(self):
+        # (assinatura, vistas do resultado) do último retrato pronto. Só espera enquanto não
+        # houver nenhum; se a primeira montagem falhou, repassa o erro para a sessão
+        if not self._pronto.is_set():
+            registrar_falha_cache('retrato_bases')
+            self._pronto.wait()
+        retrato = self._retrato
+        if retrato is None:
+            raise self._erro
+        assinatura, resultado = retrato
+        return assinatura, somente_leitura(resultado)
+
+
+def vigia_bases(pasta, preparar):
+    # Uma vigia por pasta no processo, criada na primeira chamada (a `preparar` das chamadas
+    # seguintes é ignorada: o Dashboard é reexecutado a cada interação e redefine a função)
+    with _trava:
+        if pasta not in _vigias:
+            _vigias[pasta] = Vigia(pasta, preparar).iniciar()
+        return _vigias[pasta]
@@ -0,0 +1,40 @@
+import pandas as pd
+import pytest
+
+from painel import dados, particoes
+from painel.calendario import adicionar_mes_semana
+from painel.custos import lucro_diario
+
+pytest.importorskip('pyarrow')
+
+
+def _frota(raiz):
+    # Um motorista com corridas todo dia de 2025-01-01 a 2025-02-28, KM variando por dia
+    datas = pd.date_range('2025-01-01', '2025-02-28', freq='D')
+    corridas = pd.DataFrame({'Data': datas, 'Valor': 30.0, 'KM': [5.0 + dia % 7 for dia in range(len(datas))]})
+    particoes._gravar_meses(corridas, particoes._pasta_motorista(raiz, 'corridas', 'ana'))
+    return adicionar_mes_semana(corridas)
+
+
+@pytest.mark.parametrize('lancamentos, inicio, fim', [
+    # Borda do fim: o trecho de 01-20 (1000) fica fora do período
+    ([('2025-01-01', 100.0), ('2025-01-20', 1000.0)], '2025-01-01', '2025-01-15'),
+    # Borda do início: o trecho de 01-01 (1000) termina antes do período
+    ([('2025-01-01', 1000.0), ('2025-01-10', 100.0)], '2025-01-12', '2025-01-30'),
+    # Dois tipos com trechos que passam das duas bordas
+    ([('2025-01-03', 200.0), ('2025-01-25', 80.0), ('2025-02-10', 500.0)], '2025-01-05', '2025-02-05'),
+])
+def test_custos_do_periodo_iguais_aos_da_base_inteira(tmp_path, lancamentos, inicio, fim):
+    diario = _frota(str(tmp_path))
+    df_custos = pd.DataFrame({
+        'Data': pd.to_datetime([data for data, _ in lancamentos]),
+        'Tipo': pd.Series(['Gasolina', 'Gasolina', 'Pneu'][:len(lancamentos)], dtype='string'),
+        'Valor': [valor for _, valor in lancamentos]
+    })
+
+    esperado = dados.fatiar_periodo(lucro_diario(diario, df_custos), inicio, fim)
+    lucro = particoes.lucro_periodo(str(tmp_path), 'ana', df_custos, inicio, fim)
+
+    assert len(lucro) == len(esperado)
+    assert lucro['Custos'].sum() == pytest.approx(esperado['Custos'].sum())
+    assert lucro['Lucro'].to_numpy() == pytest.approx(esperado['Lucro'].to_numpy())